@@ -117,10 +117,15 @@ def main():
     )
     phase_plotter.generate_plot()
 
+    # Cache the intensity as uint16 (4x smaller than complex64) for later re-plots:
+    # SEDPlotter(SED.load_intensity_quantized(path), '2d_intensity', ...) skips the SED recomputation
+    sed_for_plotting.save_intensity_quantized(output_dir / 'intensity_q.npz')
+
     print(f"Analysis complete. Results saved in {output_dir}")
     print("Generated files:")
     print(f"  - {output_dir / 'chiral_sed_intensity_2D.png'}")
     print(f"  - {output_dir / 'chiral_sed_phase_2D.png'}")
+    print(f"  - {output_dir / 'intensity_q.npz'}")
 
 if __name__ == "__main__":
     main() 
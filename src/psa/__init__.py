@@ -1,35 +1,51 @@
 """
 Phonon Spectral Analysis (PSA) Package
 """
+import importlib
 
 __version__ = "0.1.0" # Consider linking this to setup.py version
 
-# Core components
-from .core.trajectory import Trajectory
-from .core.sed import SED
-from .core.sed_calculator import SEDCalculator
-
-# IO components
-from .io.loader import TrajectoryLoader
-from .io.writer import TrajectoryWriter, out_to_qdump
-
-# Visualization components
-from .visualization import SEDPlotter
-from .visualization.styles import apply_style, DEFAULT_STYLE, COLOR_SCHEMES
-
-# Utility components
-from .utils.helpers import (
-    parse_direction,
-    update_dict_recursively,
-    ensure_directory,
-    validate_array_shape,
-    safe_divide
-)
-from .utils.config_manager import ConfigManager # If it's intended for public API
+# Public names are imported lazily on first access (PEP 562), so `import psa` stays cheap and
+# heavy dependencies (matplotlib, scipy, OVITO) load only when the component using them is needed.
+_LAZY_ATTRS = {
+    # Core components
+    'Trajectory': '.core.trajectory',
+    'SED': '.core.sed',
+    'SEDCalculator': '.core.sed_calculator',
+    # IO components
+    'TrajectoryLoader': '.io.loader',
+    'TrajectoryWriter': '.io.writer',
+    'out_to_qdump': '.io.writer',
+    # Visualization components
+    'SEDPlotter': '.visualization.sed_plotter',
+    'FigureCache': '.visualization.sed_plotter',
+    'apply_style': '.visualization.styles',
+    'DEFAULT_STYLE': '.visualization.styles',
+    'COLOR_SCHEMES': '.visualization.styles',
+    # Utility components
+    'parse_direction': '.utils.helpers',
+    'parse_directions': '.utils.helpers',
+    'update_dict_recursively': '.utils.helpers',
+    'ensure_directory': '.utils.helpers',
+    'validate_array_shape': '.utils.helpers',
+    'safe_divide': '.utils.helpers',
+    'ConfigManager': '.utils.config_manager', # If it's intended for public API
+}
 
 # Main CLI function (optional, if you want to allow programmatic execution of CLI)
 # from .cli import main as run_psa_cli
 
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value # Cache so later lookups bypass __getattr__
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
+
 __all__ = [
     # Core
     'Trajectory',
@@ -41,11 +57,13 @@ __all__ = [
     'out_to_qdump',
     # Visualization
     'SEDPlotter',
+    'FigureCache',
     'apply_style',
     'DEFAULT_STYLE',
     'COLOR_SCHEMES',
     # Utils
     'parse_direction',
+    'parse_directions',
     'update_dict_recursively',
     'ensure_directory',
     'validate_array_shape',
@@ -9,9 +9,9 @@ from typing import List
 from psa.io.loader import TrajectoryLoader # Corrected path
 from psa.core.sed_calculator import SEDCalculator
 from psa.core.sed import SED
-from psa.visualization.plotter import SEDPlotter
+from psa.visualization import SEDPlotter
 # from psa.utils.config_loader import update_dict_recursively # Old import
-from psa.utils.helpers import update_dict_recursively # Corrected path
+from psa.utils.helpers import update_dict_recursively, parse_directions # Corrected path
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +38,7 @@ def main():
     default_config = {
         'general': {'trajectory_file_format':'auto', 'use_displacements':False, 'save_npy_trajectory':True, 'save_npy_sed_data':True, 'chiral_mode_enabled':False},
         'md_system': {'dt':0.001, 'nx':1, 'ny':1, 'nz':1, 'lattice_parameter':None},
-        'sed_calculation': {'directions':[[1,0,0]], 'n_kpoints':100, 'bz_coverage':1.0, 'polarization_indices_chiral':[0,1], 'basis':{'atom_indices':None, 'atom_types':None}},
+        'sed_calculation': {'directions':[[1,0,0]], 'n_kpoints':100, 'bz_coverage':1.0, 'polarization_indices_chiral':[0,1], 'output_half_spectrum':False, 'basis':{'atom_indices':None, 'atom_types':None}},
         'plotting': {'max_freq_2d':None, 'highlight_2d_intensity':{'k_min':None,'k_max':None,'w_min':None,'w_max':None}, 'enable_3d_dispersion_plot':True, '3d_plot_settings':{'intensity_log_scale':True, 'intensity_thresh_rel':0.05}},
         'ised': {'apply':False, 'k_path':{'direction':'x', 'characteristic_length':None, 'n_points':50, 'bz_coverage':None}, 'target_point':{'k_value':6.283, 'w_value_thz':10.0}, 'basis':{'atom_indices':None, 'atom_types':None}, 'reconstruction':{'rescaling_factor':'auto', 'num_animation_timesteps':100, 'output_dump_filename':'ised_motion.dump'}}
     }
@@ -88,22 +88,12 @@ def main():
             raise ValueError("Main SED basis indices out of bounds.")
 
         global_max_i = None; dirs_list = sed_cfg['directions']
-        if len(dirs_list) > 1 and not gen_cfg['chiral_mode_enabled']:
-            logger.info("Calculating global max intensity for plot normalization...")
-            max_i_vals = []
-            for dir_s in dirs_list:
-                k_mags_norm, k_vecs_norm = sed_calc.get_k_path(dir_s, sed_cfg['bz_coverage'], sed_cfg['n_kpoints'], eff_lat_param)
-                sed_obj_norm = sed_calc.calculate(k_points_mags=k_mags_norm, 
-                                                  k_vectors_3d=k_vecs_norm, 
-                                                  basis_atom_indices=main_sed_basis_idx,
-                                                  k_grid_shape=None)
-                sed_complex_norm = sed_obj_norm.sed
-                curr_i = np.sum(np.abs(sed_complex_norm)**2, axis=-1)
-                if curr_i.size > 0: max_i_vals.append(np.max(curr_i))
-            if max_i_vals: global_max_i = np.max(max_i_vals)
-            logger.info(f"Global max intensity: {global_max_i:.4e}" if global_max_i else "Not determined.")
+        dir_units = parse_directions(dirs_list) # Parse every direction once
+        # The global max for plot normalization is collected during the main pass, so each direction is computed only once
+        track_global_max = len(dirs_list) > 1 and not gen_cfg['chiral_mode_enabled']
+        max_i_vals = []
 
-        all_sed_results = []
+        all_sed_results = []; dir_labels = []
         for i_d, dir_val_spec in enumerate(dirs_list, 1):
             if isinstance(dir_val_spec,(int,float)): d_lbl=f"{dir_val_spec:.1f}deg"
             elif isinstance(dir_val_spec,str): d_lbl=dir_val_spec.replace(" ","_").replace("/","-")
@@ -119,18 +109,19 @@ def main():
             sed_savefile_base = out_dir / f"sed_data_{sed_sfx}_{d_lbl}{basis_sfx}"
 
             if gen_cfg['save_npy_sed_data'] and not args.recalculate_sed:
-                try: sed_res = SED.load(sed_savefile_base); logger.info(f"Loaded SED data for {d_lbl}.")
+                try: sed_res = SED.load(sed_savefile_base, mmap_mode='r'); logger.info(f"Loaded SED data for {d_lbl}.")
                 except FileNotFoundError: logger.info(f"No pre-calculated SED for {d_lbl}. Will calculate.")
                 except Exception as e: logger.warning(f"Failed to load SED for {d_lbl}: {e}. Recalculating.")
             
             needs_recalc_for_phase = gen_cfg['chiral_mode_enabled'] and (sed_res is None or (sed_res.phase is None and not sed_savefile_base.with_suffix('.phase.npy').exists()))
             if sed_res is None or needs_recalc_for_phase:
                 if needs_recalc_for_phase and sed_res: logger.info(f"Recalculating SED for {d_lbl} (phase data needed).")
-                k_m, k_v = sed_calc.get_k_path(dir_val_spec, sed_cfg['bz_coverage'], sed_cfg['n_kpoints'], eff_lat_param)
+                k_m, k_v = sed_calc.get_k_path(dir_units[i_d-1], sed_cfg['bz_coverage'], sed_cfg['n_kpoints'], eff_lat_param)
                 sed_obj_calc = sed_calc.calculate(k_points_mags=k_m, 
                                                   k_vectors_3d=k_v, 
                                                   basis_atom_indices=main_sed_basis_idx,
-                                                  k_grid_shape=None)
+                                                  k_grid_shape=None,
+                                                  output_half_spectrum=sed_cfg['output_half_spectrum'])
                 sed_complex = sed_obj_calc.sed
                 freqs_arr = sed_obj_calc.freqs
 
@@ -146,12 +137,22 @@ def main():
                               k_vectors=sed_obj_calc.k_vectors,
                               phase=phase_arr,
                               is_complex=sed_obj_calc.is_complex,
-                              k_grid_shape=sed_obj_calc.k_grid_shape,
-                              dt_ps=sed_obj_calc.dt_ps,
-                              trajectory_metadata=sed_obj_calc.trajectory_metadata)
-                if gen_cfg['save_npy_sed_data']: sed_res.save(sed_savefile_base)
+                              k_grid_shape=sed_obj_calc.k_grid_shape)
+                if gen_cfg['save_npy_sed_data']:
+                    sed_res.save(sed_savefile_base)
+                    # Keep only a memory-mapped view of the saved arrays so RSS stays bounded across directions
+                    sed_res = SED.load(sed_savefile_base, mmap_mode='r')
+                    sed_res.is_complex = sed_obj_calc.is_complex
             
-            all_sed_results.append(sed_res)
+            all_sed_results.append(sed_res); dir_labels.append(d_lbl)
+            if track_global_max and sed_res.sed.size > 0:
+                max_i_vals.append(np.max(sed_res.intensity)) # Cached on sed_res; reused by its intensity plot
+
+        if track_global_max:
+            if max_i_vals: global_max_i = np.max(max_i_vals)
+            logger.info(f"Global max intensity: {global_max_i:.4e}" if global_max_i else "Not determined.")
+
+        for d_lbl, sed_res in zip(dir_labels, all_sed_results):
             plot_args = {'direction_label': d_lbl, 'max_freq': plot_cfg['max_freq_2d']}
             if gen_cfg['chiral_mode_enabled']:
                 if sed_res.phase is not None: SEDPlotter(sed_res, '2d_phase', str(out_dir/f"sed_phase_2D_{d_lbl}{basis_sfx}.png"), **plot_args).generate_plot()
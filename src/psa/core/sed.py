@@ -2,6 +2,7 @@
 Core spectral energy density (SED) data structure.
 """
 from dataclasses import dataclass
+from functools import cached_property
 import numpy as np
 from typing import Optional, Tuple
 from pathlib import Path
@@ -19,9 +20,37 @@ class SED:
     phase: Optional[np.ndarray] = None
     is_complex: bool = True  # Indicates if sed attribute holds complex amplitudes or intensities
 
-    @property
+    def __post_init__(self):
+        # Hold references, never copies: the (possibly GB-scale) sed/phase buffers are shared by every
+        # plotter using this object. asanyarray keeps np.memmap arrays from SED.load(mmap_mode=...) mapped.
+        self.sed = np.asanyarray(self.sed)
+        self.freqs = np.asanyarray(self.freqs)
+        self.k_points = np.asanyarray(self.k_points)
+        self.k_vectors = np.asanyarray(self.k_vectors)
+        if self.phase is not None:
+            self.phase = np.asanyarray(self.phase)
+
+    @classmethod
+    def from_intensity(cls, intensity: np.ndarray, freqs: np.ndarray, k_points: np.ndarray, k_vectors: np.ndarray,
+                       k_grid_shape: Optional[Tuple[int, ...]] = None) -> 'SED':
+        """Non-complex SED holding an already summed (n_freqs, n_k) intensity, shared as a (..., 1) view without copying."""
+        intensity = np.asarray(intensity)
+        return cls(intensity[..., np.newaxis], freqs, k_points, k_vectors, k_grid_shape=k_grid_shape, is_complex=False)
+
+    @cached_property
     def intensity(self) -> np.ndarray:
-        return np.sum(np.abs(self.sed)**2, axis=-1).astype(np.float32)
+        """Total intensity sum over the last axis of |sed|^2; computed once and shared by every plot of this SED."""
+        if not self.is_complex:
+            # Already intensities per polarization
+            return np.sum(self.sed, axis=-1).astype(np.float32, copy=False)
+        # |z|^2 as re^2 + im^2 (no sqrt as in np.abs), accumulated in place one polarization at a time
+        # so temporaries stay intensity-sized instead of full complex-to-float copies
+        intensity = np.zeros(self.sed.shape[:-1], dtype=np.float32)
+        for i_pol in range(self.sed.shape[-1]):
+            sed_pol = self.sed[..., i_pol]
+            intensity += sed_pol.real**2
+            intensity += sed_pol.imag**2
+        return intensity
 
     def save(self, base_path: Path):
         base_path.parent.mkdir(parents=True, exist_ok=True)
@@ -37,13 +66,52 @@ class SED:
             np.save(base_path.with_suffix('.phase.npy'), self.phase)
         logger.info(f"SED data saved: {base_path.name}.*.npy")
 
+    def save_intensity_quantized(self, path: Path, dynamic_range_decades: float = 12.0):
+        """
+        Save intensity as a compressed uint16 .npz for re-plotting (2 B/elem instead of 8 for complex64).
+
+        Quantization is done on log10(intensity) over `dynamic_range_decades` below the maximum, so the
+        relative error is uniform (~0.05% per step at 12 decades) and survives linear, sqrt and log scaling.
+        Values below that floor are stored as the floor.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        intensity = self.intensity
+        i_max = float(np.max(intensity)) if intensity.size else 0.0
+        if i_max <= 0:
+            vmin = vmax = 0.0
+            q = np.zeros(intensity.shape, dtype=np.uint16)
+        else:
+            vmax = np.log10(i_max)
+            vmin = vmax - dynamic_range_decades
+            log_i = np.log10(np.maximum(intensity, 10.0**vmin))
+            q = np.rint((log_i - vmin) / (vmax - vmin) * 65535).astype(np.uint16)
+        np.savez_compressed(path, q=q, vmin=vmin, vmax=vmax, freqs=self.freqs,
+                            k_points=self.k_points, k_vectors=self.k_vectors,
+                            k_grid_shape=np.array(self.k_grid_shape if self.k_grid_shape is not None else []))
+        logger.info(f"Quantized SED intensity saved: {path.name}")
+
+    @staticmethod
+    def load_intensity_quantized(path: Path) -> 'SED':
+        """Load an intensity cache written by save_intensity_quantized() as a non-complex SED ready for plotting."""
+        with np.load(path) as data:
+            vmin, vmax = float(data['vmin']), float(data['vmax'])
+            if vmax == vmin:
+                intensity = np.zeros(data['q'].shape, dtype=np.float32)
+            else:
+                intensity = 10.0 ** (data['q'].astype(np.float32) / 65535 * (vmax - vmin) + vmin)
+            k_grid_shape = tuple(map(int, data['k_grid_shape'])) or None
+            return SED.from_intensity(intensity.astype(np.float32, copy=False), data['freqs'], data['k_points'],
+                                      data['k_vectors'], k_grid_shape=k_grid_shape)
+
     @staticmethod
-    def load(base_path: Path) -> 'SED':
+    def load(base_path: Path, mmap_mode: Optional[str] = None) -> 'SED':
+        """Load SED data saved by save(); with mmap_mode (e.g. 'r') the large sed/phase arrays are memory-mapped."""
         required_suffixes = ['.sed.npy', '.freqs.npy', '.k_points.npy', '.k_vectors.npy']
         if not all((base_path.with_suffix(s)).exists() for s in required_suffixes):
             raise FileNotFoundError(f"Required SED files missing for base: {base_path.name}")
 
-        sed_val = np.load(base_path.with_suffix('.sed.npy'))
+        sed_val = np.load(base_path.with_suffix('.sed.npy'), mmap_mode=mmap_mode)
         freqs_val = np.load(base_path.with_suffix('.freqs.npy'))
         k_points_val = np.load(base_path.with_suffix('.k_points.npy'))
         k_vectors_val = np.load(base_path.with_suffix('.k_vectors.npy'))
@@ -51,7 +119,7 @@ class SED:
         phase_file = base_path.with_suffix('.phase.npy')
         if phase_file.exists():
             try:
-                phase_val = np.load(phase_file)
+                phase_val = np.load(phase_file, mmap_mode=mmap_mode)
             except Exception as e:
                 logger.warning(f"Could not load phase data from {phase_file.name}: {e}")
         
@@ -2,26 +2,161 @@
 Core SED calculation engine.
 """
 import numpy as np
-from typing import Tuple, List, Optional, Union, Dict
+from typing import Tuple, List, Optional, Union, Dict, TYPE_CHECKING
 import logging
+import hashlib
+import os
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from tqdm import tqdm
 
 from .trajectory import Trajectory
 from .sed import SED
-from ..utils.helpers import parse_direction
+from ..utils.helpers import parse_direction, nearest_index
 from ..io.writer import out_to_qdump
-from ..visualization import SEDPlotter
+
+if TYPE_CHECKING: # Annotation only: importing the plotter at runtime would pull in matplotlib
+    from ..visualization.sed_plotter import FigureCache
+
+# Prefer scipy's multithreaded pocketfft (keeps single precision), fall back to NumPy's FFT
+try:
+    import scipy.fft as scipy_fft
+    SCIPY_FFT_AVAILABLE = True
+except ImportError:
+    SCIPY_FFT_AVAILABLE = False
+
+# Optional FFTW backend: with the interface cache on, the plan for each repeated chunk shape
+# is built once (FFTW_MEASURE) and reused by every later k-chunk of the same shape. The cache
+# is process-wide pyFFTW state, so it is switched on at the first FFT (_pyfftw_interface), not at import
+try:
+    import pyfftw
+    import pyfftw.interfaces.scipy_fft as pyfftw_fft
+    PYFFTW_AVAILABLE = True
+except ImportError:
+    PYFFTW_AVAILABLE = False
+_pyfftw_cache_enabled = False
+
+# Optional GPU backend for the SED kernel (device='cuda')
+try:
+    import cupy
+    CUPY_AVAILABLE = True
+except ImportError:
+    CUPY_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Default upper bound on the per-chunk working set of the SED kernel (phase table + GEMM/FFT outputs);
+# override per calculator with SEDCalculator(k_chunk_memory_budget_bytes=...)
+K_CHUNK_MEMORY_BUDGET_BYTES = 512 * 1024**2
+# Target size of one atom tile of the phase table (about an L2 cache), so each tile is built
+# and consumed by the GEMM while still cached; tiles never shrink below MIN_ATOM_TILE atoms
+PHASE_TILE_MEMORY_BYTES = 256 * 1024
+MIN_ATOM_TILE = 64
+
+def _pyfftw_interface():
+    """pyFFTW's scipy_fft interface, turning its plan cache on at the first FFT rather than at import."""
+    global _pyfftw_cache_enabled
+    if not _pyfftw_cache_enabled:
+        pyfftw.interfaces.cache.enable()
+        pyfftw.interfaces.cache.set_keepalive_time(60)
+        _pyfftw_cache_enabled = True
+    return pyfftw_fft
+
+def _fft_scratch(x: np.ndarray, axis: int) -> np.ndarray:
+    """FFT along axis; x is a scratch buffer and may be overwritten."""
+    if CUPY_AVAILABLE and isinstance(x, cupy.ndarray):
+        return cupy.fft.fft(x, axis=axis)  # cuFFT, keeps single precision
+    if PYFFTW_AVAILABLE:
+        return _pyfftw_interface().fft(x, axis=axis, overwrite_x=True, workers=os.cpu_count(),
+                                       planner_effort='FFTW_MEASURE')
+    if SCIPY_FFT_AVAILABLE:
+        return scipy_fft.fft(x, axis=axis, workers=-1, overwrite_x=True)
+    return np.fft.fft(x, axis=axis)
+
+def _rfft_real(x: np.ndarray, axis: int) -> np.ndarray:
+    """Real-input FFT along axis, keeping only the non-negative frequencies."""
+    if CUPY_AVAILABLE and isinstance(x, cupy.ndarray):
+        return cupy.fft.rfft(x, axis=axis)
+    if PYFFTW_AVAILABLE:
+        return _pyfftw_interface().rfft(x, axis=axis, workers=os.cpu_count(), planner_effort='FFTW_MEASURE')
+    if SCIPY_FFT_AVAILABLE:
+        return scipy_fft.rfft(x, axis=axis, workers=-1)
+    return np.fft.rfft(x, axis=axis)
+
+# One-pass str.translate tables for k-direction labels
+_BRACKET_TBL = str.maketrans('', '', '[]()')
+_PATH_SAFE_TBL = str.maketrans({' ': '_', '/': '-'})
+_DOT_TO_P = str.maketrans({'.': 'p'})
+# iSED input-spectrum plot name: direction label, k target, w target (targets with '.' as 'p')
+_ISED_FNAME_FMT = "iSED_{0}_{1}_{2}.png"
+
+@lru_cache(maxsize=256)
+def _format_k_dir_cached(kind: str, value) -> str:
+    if kind == 'str':
+        k_dir_str = value.translate(_PATH_SAFE_TBL)
+    elif kind == 'vector':
+        k_dir_str = f"({','.join([f'{x:.2f}' for x in value])})"
+    elif kind == 'hkl':
+        k_dir_str = f"(h{value[0]}_k{value[1]}_l{value[2]})"
+    else:
+        k_dir_str = str(value)
+    return k_dir_str.translate(_BRACKET_TBL) # Clean common brackets
+
+def _vector_key(spec) -> Tuple[str, tuple]:
+    return 'vector', tuple(np.asarray(spec).ravel().tolist())
+
+# Exact-type dispatch to the (kind, hashable value) cache key of each k-direction spec form
+_K_DIR_KEYS = {
+    str: lambda spec: ('str', spec),
+    list: _vector_key,
+    tuple: _vector_key,
+    np.ndarray: _vector_key,
+    dict: lambda spec: ('hkl', (spec.get('h',0), spec.get('k',0), spec.get('l',0))),
+}
+
+def _format_k_dir_spec(k_dir_spec: Union[str, int, float, List[float], np.ndarray, Dict[str, float]]) -> str:
+    """Filename/label form of a k-direction spec; memoized on a hashable key across iSED plots."""
+    make_key = _K_DIR_KEYS.get(type(k_dir_spec))
+    if make_key is None:
+        # Subclasses (e.g. np.str_, OrderedDict) fall back to their first matching base
+        make_key = next((fn for base, fn in _K_DIR_KEYS.items() if isinstance(k_dir_spec, base)),
+                        lambda spec: ('other', spec))
+    return _format_k_dir_cached(*make_key(k_dir_spec))
+
 class SEDCalculator:
     def __init__(self, traj: Trajectory, nx: int, ny: int, nz: int, 
-                 use_displacements: bool = False, dt_ps: Optional[float] = None):
+                 use_displacements: bool = False, dt_ps: Optional[float] = None,
+                 dtype: Union[type, np.dtype] = np.complex64,
+                 phase_cache_dir: Optional[Union[str, Path]] = None,
+                 device: str = 'cpu',
+                 k_chunk_memory_budget_bytes: int = K_CHUNK_MEMORY_BUDGET_BYTES):
         if not (nx > 0 and ny > 0 and nz > 0):
             raise ValueError("System dimensions (nx, ny, nz) must be positive.")
+        if k_chunk_memory_budget_bytes <= 0:
+            raise ValueError(f"k_chunk_memory_budget_bytes must be positive, got {k_chunk_memory_budget_bytes}")
+        # Cap on the kernel working set of one k-chunk; calculate() shrinks k_chunk_size to fit it
+        self.k_chunk_memory_budget_bytes = int(k_chunk_memory_budget_bytes)
         self.traj = traj
         self.use_displacements = use_displacements
+        # Precision of the SED kernel and its output: complex64 (default) or complex128
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.complex64, np.complex128):
+            raise ValueError(f"dtype must be np.complex64 or np.complex128, got {self.dtype}")
+        self.real_dtype = np.finfo(self.dtype).dtype
+        # Optional on-disk cache of exp(i k·r) phase tables, reused across runs with identical inputs
+        self.phase_cache_dir = Path(phase_cache_dir) if phase_cache_dir is not None else None
+        # Where the SED kernel runs: 'cpu' (NumPy) or 'cuda' (CuPy: cuBLAS GEMM + cuFFT)
+        if device not in ('cpu', 'cuda'):
+            raise ValueError(f"device must be 'cpu' or 'cuda', got {device!r}")
+        if device == 'cuda' and not CUPY_AVAILABLE:
+            raise ImportError("CuPy is not available. Please install CuPy to run the SED kernel with device='cuda'.")
+        self.device = device
+        self._xp = cupy if device == 'cuda' else np
+        # On the GPU the kernel's input trajectory lives on the device for the calculator's lifetime:
+        # one host-to-device copy here, after which groups are gathered on the device
+        self._device_source = None
+        if device == 'cuda':
+            self._device_source = cupy.asarray(self.traj.positions if use_displacements else self.traj.velocities)
         
         if dt_ps is not None:
             logger.warning("Explicitly providing dt_ps to SEDCalculator is deprecated. "
@@ -43,45 +178,182 @@ class SEDCalculator:
         if any(np.linalg.norm(v) < 1e-9 for v in [self.a1, self.a2, self.a3]):
             raise ValueError("One or more primitive vectors (a1,a2,a3) near zero. Check nx,ny,nz or box matrix.")
 
-        vol_prim = np.abs(np.dot(self.a1, np.cross(self.a2, self.a3)))
+        mat_A = np.vstack([self.a1, self.a2, self.a3]).astype(np.float64)
+        vol_prim = np.abs(np.linalg.det(mat_A))
         if np.isclose(vol_prim, 0): 
-            mat_A = np.vstack([self.a1, self.a2, self.a3])
-            if np.linalg.matrix_rank(mat_A) < 3 or np.isclose(np.linalg.det(mat_A),0):
+            if np.linalg.matrix_rank(mat_A) < 3:
                  raise ValueError(f"Primitive cell vectors coplanar/collinear; volume zero ({vol_prim:.2e}).")
-            else: logger.warning(f"Primitive cell volume very small ({vol_prim:.2e}).")
-
-        self.b1 = (2*np.pi/vol_prim) * np.cross(self.a2, self.a3)
-        self.b2 = (2*np.pi/vol_prim) * np.cross(self.a3, self.a1)
-        self.b3 = (2*np.pi/vol_prim) * np.cross(self.a1, self.a2)
-        self.recip_vecs_prim = np.vstack([self.b1, self.b2, self.b3]).astype(np.float32)
-
-    def _calculate_sed_for_group(self, k_vectors_3d: np.ndarray, 
-                                   group_atom_indices: np.ndarray, 
-                                   mean_pos_all: np.ndarray) -> np.ndarray: # Returns complex SED for the group
-        """Helper to calculate complex SED for a specific group of atoms."""
-        n_t = self.traj.n_frames
+            logger.warning(f"Primitive cell volume very small ({vol_prim:.2e}).")
+
+        # Rows of 2*pi*inv(A).T are the reciprocal vectors b_i with a_i·b_j = 2*pi*delta_ij
+        recip_vecs = 2*np.pi * np.linalg.inv(mat_A).T
+        self.b1, self.b2, self.b3 = recip_vecs
+        self.recip_vecs_prim = recip_vecs.astype(np.float32)
+
+        # Atoms sorted by type (stable, so each type's indices stay ascending) for basis selection
+        self._types_order = np.argsort(self.traj.types, kind='stable')
+        self._types_sorted = self.traj.types[self._types_order]
+
+    def _atom_indices_for_types(self, type_group: Union[int, List[int]]) -> np.ndarray:
+        """Ascending indices of the atoms whose type is in type_group."""
+        type_vals = np.unique(np.asarray(type_group, dtype=self._types_sorted.dtype))
+        starts = np.searchsorted(self._types_sorted, type_vals, side='left')
+        ends = np.searchsorted(self._types_sorted, type_vals, side='right')
+        runs = [self._types_order[lo:hi] for lo, hi in zip(starts, ends) if hi > lo]
+        if not runs:
+            return np.array([], dtype=np.intp)
+        return runs[0] if len(runs) == 1 else np.sort(np.concatenate(runs))
+
+    def _prepare_group_data(self, group_atom_indices: np.ndarray,
+                            mean_pos_all: np.ndarray,
+                            half_spectrum: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Gather the SED input of one atom group, independent of k.
         
-        if group_atom_indices.size == 0:
-            return np.zeros((n_t, len(k_vectors_3d), 3), dtype=np.complex64)
-
-        mean_pos_group = mean_pos_all[group_atom_indices]
+        Returns the data as a C-contiguous real (n_atoms_group, 3*n_t) matrix of self.real_dtype
+        holding each atom's component time series (velocities, or displacements from the mean
+        positions) and the group's mean positions. Built once per group and reused by every k-chunk.
+        With half_spectrum, the real per-atom series are transformed here instead (rfft,
+        normalized by n_t), giving a complex (n_atoms_group, 3*(n_t//2+1)) spectral matrix of self.dtype.
+        """
+        n_t = self.traj.n_frames
+        xp = self._xp
+        mean_pos_group = mean_pos_all[group_atom_indices].astype(self.real_dtype, copy=False)
         
-        if self.use_displacements:
-            data_ft_group = (self.traj.positions[:, group_atom_indices, :] - mean_pos_group[None, :, :])
+        if self._device_source is not None:
+            source = self._device_source
         else:
-            data_ft_group = self.traj.velocities[:, group_atom_indices, :]
+            source = self.traj.positions if self.use_displacements else self.traj.velocities
+        # Gather only this group's atoms, then lay them out atom-major (a, 3, t) in the kernel dtype in
+        # one contiguous copy; both copies are per-group and freed with the group data
+        data_ft_group = xp.ascontiguousarray(source[:, xp.asarray(group_atom_indices)].transpose(1, 2, 0),
+                                             dtype=self.real_dtype)
+        if self.use_displacements:
+            # The gather returned a fresh copy, so subtract the mean in place
+            data_ft_group -= xp.asarray(mean_pos_group)[:, :, None]
+        n_atoms_group = data_ft_group.shape[0]
+        if half_spectrum:
+            # The time FFT commutes with the k-projection, so transform the real atom series once
+            # per group: half the spectrum, and no per-k-chunk FFT
+            spectral_group = _rfft_real(data_ft_group, axis=-1)
+            spectral_group /= n_t
+            group_data = spectral_group.reshape(n_atoms_group, -1).astype(self.dtype, copy=False)
+            return group_data, mean_pos_group
+        # Kept real: the kernel projects it with two real GEMMs against cos/sin tables, half the
+        # flops and bytes of a complex GEMM on data whose imaginary part is zero
+        group_data = data_ft_group.reshape(n_atoms_group, 3 * n_t)
+        return group_data, mean_pos_group
+
+    def _to_host(self, arr):
+        """Return arr as a NumPy array, copying it back from the GPU if needed."""
+        return cupy.asnumpy(arr) if self.device == 'cuda' else arr
 
+    def _calculate_sed_for_group(self, k_vectors_3d: np.ndarray, 
+                                   group_data: np.ndarray, 
+                                   mean_pos_group: np.ndarray,
+                                   is_spectral: bool = False) -> np.ndarray: # Returns complex SED for the group
+        """Helper to calculate complex SED for a group prepared by _prepare_group_data."""
+        n_t = group_data.shape[1] // 3 # Frames, or frequencies if group_data is already spectral
         n_k_vecs = len(k_vectors_3d)
-        sed_tk_pol_group = np.zeros((n_t, n_k_vecs, 3), dtype=np.complex64)
-
-        # Optimized phase factor calculation and summation using einsum
-        phase_factors_exp = np.exp(1j * np.dot(k_vectors_3d, mean_pos_group.T))
-
-        for pol_axis in range(3):
-            sed_tk_pol_group[:, :, pol_axis] = np.einsum('ta,ak->tk', data_ft_group[:, :, pol_axis], phase_factors_exp.T, optimize=True)
-
-        sed_wk_group = np.fft.fft(sed_tk_pol_group, axis=0) / n_t if n_t > 0 else np.array([],dtype=np.complex64).reshape(0,n_k_vecs,3)
-        return sed_wk_group.astype(np.complex64)
+        
+        if mean_pos_group.shape[0] == 0:
+            return np.zeros((n_t, n_k_vecs, 3), dtype=self.dtype)
+        if n_t == 0:
+            return np.array([], dtype=self.dtype).reshape(0, n_k_vecs, 3)
+
+        # Contraction over atoms for every k-point and polarization as GEMMs (the transposed phase
+        # table is passed to BLAS as-is): (k, a) x (a, p*t) -> (k, p*t). The atoms are tiled so each
+        # exp(i k·r) tile is built and used while cache-resident; the full table is never materialized.
+        n_atoms_group = mean_pos_group.shape[0]
+        atom_tile = max(MIN_ATOM_TILE, PHASE_TILE_MEMORY_BYTES // (n_k_vecs * self.dtype.itemsize))
+        tiles = [(a0, min(a0 + atom_tile, n_atoms_group)) for a0 in range(0, n_atoms_group, atom_tile)]
+        if self._xp.iscomplexobj(group_data):
+            sed_kpt_group = None
+            for a0, a1 in tiles:
+                tile_kpt = self._phase_table(mean_pos_group[a0:a1], k_vectors_3d).T @ group_data[a0:a1]
+                if sed_kpt_group is None:
+                    sed_kpt_group = tile_kpt
+                else:
+                    sed_kpt_group += tile_kpt
+        else:
+            # Real data: Re = cos.T @ data and Im = sin.T @ data as two real GEMMs
+            sed_re, sed_im = None, None
+            for a0, a1 in tiles:
+                cos_tile, sin_tile = self._phase_cos_sin(mean_pos_group[a0:a1], k_vectors_3d)
+                tile_re, tile_im = cos_tile.T @ group_data[a0:a1], sin_tile.T @ group_data[a0:a1]
+                if sed_re is None:
+                    sed_re, sed_im = tile_re, tile_im
+                else:
+                    sed_re += tile_re
+                    sed_im += tile_im
+            sed_kpt_group = sed_re.astype(self.dtype)
+            sed_kpt_group.imag = sed_im
+        sed_kpt_group = sed_kpt_group.reshape(n_k_vecs, 3, n_t)
+        if is_spectral:
+            return self._to_host(sed_kpt_group.transpose(2, 0, 1)).astype(self.dtype, copy=False)
+
+        # One batched FFT along the contiguous time axis for all (k, pol) series; normalize in place
+        sed_kpw_group = _fft_scratch(sed_kpt_group, axis=-1)
+        sed_kpw_group /= n_t
+        # Back to the (t, k, pol) layout expected by callers
+        return self._to_host(sed_kpw_group.transpose(2, 0, 1)).astype(self.dtype, copy=False)
+
+    def _phase_table(self, mean_pos_group: np.ndarray, k_vectors_3d: np.ndarray) -> np.ndarray:
+        """Phase table exp(i k·r), shape (n_atoms, n_k); loaded from / saved to phase_cache_dir if set."""
+        xp = self._xp
+        k_vectors_t = k_vectors_3d.T.astype(self.real_dtype, copy=False)
+        if self.phase_cache_dir is None:
+            return self._exp_i(xp.asarray(mean_pos_group) @ xp.asarray(k_vectors_t))
+
+        key = hashlib.blake2b(digest_size=16)
+        for arr in (mean_pos_group, k_vectors_t):
+            key.update(str((arr.shape, arr.dtype.str)).encode())
+            key.update(np.ascontiguousarray(arr).tobytes())
+        key.update(self.dtype.str.encode())
+        cache_file = self.phase_cache_dir / f"phase_{key.hexdigest()}.npy"
+        if cache_file.exists():
+            try:
+                logger.debug("Loading cached phase table %s", cache_file.name)
+                return xp.asarray(np.load(cache_file, mmap_mode='r'))
+            except Exception as e:
+                logger.warning(f"Could not load cached phase table {cache_file.name}: {e}. Recomputing.")
+
+        phase_table = self._exp_i(xp.asarray(mean_pos_group) @ xp.asarray(k_vectors_t))
+        try:
+            self.phase_cache_dir.mkdir(parents=True, exist_ok=True)
+            np.save(cache_file, self._to_host(phase_table))
+        except OSError as e:
+            logger.warning(f"Could not write phase table cache {cache_file.name}: {e}")
+        return phase_table
+
+    def _phase_cos_sin(self, mean_pos_group: np.ndarray, k_vectors_3d: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Contiguous real parts cos(k·r) and sin(k·r) of the phase table, each of shape (n_atoms, n_k)."""
+        xp = self._xp
+        if self.phase_cache_dir is None:
+            theta = xp.asarray(mean_pos_group) @ xp.asarray(k_vectors_3d.T.astype(self.real_dtype, copy=False))
+            return xp.cos(theta), xp.sin(theta)
+        # Reuse the cached complex table; split into contiguous planes so BLAS reads them directly
+        phase_table = self._phase_table(mean_pos_group, k_vectors_3d)
+        return xp.ascontiguousarray(phase_table.real), xp.ascontiguousarray(phase_table.imag)
+
+    def _exp_i(self, theta: np.ndarray) -> np.ndarray:
+        """exp(i*theta) for real theta, as self.dtype."""
+        # Separate real cos/sin passes written straight into the complex table's real/imag views:
+        # vectorized real transcendentals instead of complex exp, and no complex temporary
+        phase_table = self._xp.empty(theta.shape, dtype=self.dtype)
+        self._xp.cos(theta, out=phase_table.real)
+        self._xp.sin(theta, out=phase_table.imag)
+        return phase_table
+
+    def _max_k_chunk_for_budget(self, n_group_atoms: int) -> int:
+        """Largest number of k-points per chunk whose kernel working set fits k_chunk_memory_budget_bytes."""
+        n_t = self.traj.n_frames
+        # phase table column + GEMM output (plus a per-tile product when atoms are tiled)
+        # + FFT output (complex128 in the NumPy fallback), plus the previous chunk's result
+        # still being written out by the pipeline, per k-point
+        itemsize = self.dtype.itemsize
+        bytes_per_k = itemsize * n_group_atoms + (3 * itemsize + 16) * 3 * n_t
+        return max(1, self.k_chunk_memory_budget_bytes // max(1, bytes_per_k))
 
     def get_k_path(self, direction_spec: Union[str, int, float, List[float], Dict[str, float], np.ndarray],
                    bz_coverage: float, n_k: int, lat_param: Optional[float] = None
@@ -91,13 +363,10 @@ class SEDCalculator:
         if lat_param is None or lat_param <= 1e-6:
             # Calculate the projection of the k-direction onto the reciprocal lattice vectors
             # This gives the true reciprocal lattice extent in the specified direction
-            b_proj_x = np.dot(k_dir_unit, self.b1)
-            b_proj_y = np.dot(k_dir_unit, self.b2) 
-            b_proj_z = np.dot(k_dir_unit, self.b3)
+            b_proj_x, b_proj_y, b_proj_z = np.vstack([self.b1, self.b2, self.b3]) @ k_dir_unit
             
             # Find the largest projection magnitude to determine the BZ boundary
-            projections = [abs(b_proj_x), abs(b_proj_y), abs(b_proj_z)]
-            max_projection = max(projections)
+            max_projection = max(abs(b_proj_x), abs(b_proj_y), abs(b_proj_z))
             
             if max_projection > 1e-6:
                 # Use the reciprocal projection as the characteristic k-extent
@@ -121,7 +390,8 @@ class SEDCalculator:
         if n_k < 1: 
             raise ValueError("n_k (k-points) must be >= 1.")
         k_mags = np.linspace(0, k_max_val, n_k, dtype=np.float32) if n_k > 1 else np.array([0.0 if np.isclose(k_max_val,0) else k_max_val], dtype=np.float32)
-        k_vecs = np.outer(k_mags, k_dir_unit).astype(np.float32)
+        # Straight line from Gamma: broadcast the float32 magnitudes onto the unit direction (C-contiguous)
+        k_vecs = k_mags[:, None] * k_dir_unit.astype(np.float32)[None, :]
         return k_mags, k_vecs
 
     def get_k_grid(self, 
@@ -155,23 +425,18 @@ class SEDCalculator:
         kx_vals = np.linspace(k_range_x[0], k_range_x[1], n_kx, dtype=np.float32)
         ky_vals = np.linspace(k_range_y[0], k_range_y[1], n_ky, dtype=np.float32)
 
-        k_vectors_list = []
-        if plane.lower() == "xy":
-            for kx in kx_vals:
-                for ky in ky_vals:
-                    k_vectors_list.append([kx, ky, k_fixed_val])
-        elif plane.lower() == "yz":
-            for ky in kx_vals: # Note: kx_vals corresponds to the first range, which is y for yz plane
-                for kz in ky_vals: # Note: ky_vals corresponds to the second range, which is z for yz plane
-                    k_vectors_list.append([k_fixed_val, ky, kz])
-        elif plane.lower() == "zx":
-            for kz in kx_vals: # Note: kx_vals corresponds to the first range, which is z for zx plane
-                for kx in ky_vals: # Note: ky_vals corresponds to the second range, which is x for zx plane
-                    k_vectors_list.append([kx, k_fixed_val, kz])
-        else:
+        # Columns of k_vectors_3d holding the (first range, second range, fixed) components
+        plane_columns = {"xy": (0, 1, 2), "yz": (1, 2, 0), "zx": (2, 0, 1)}
+        if plane.lower() not in plane_columns:
             raise ValueError(f"Invalid plane specified: {plane}. Must be 'xy', 'yz', or 'zx'.")
-
-        k_vectors_3d = np.array(k_vectors_list, dtype=np.float32)
+        col_first, col_second, col_fixed = plane_columns[plane.lower()]
+
+        # First range varies slowest (ij indexing), matching the (n_kx, n_ky) grid shape
+        k_first, k_second = np.meshgrid(kx_vals, ky_vals, indexing='ij')
+        k_vectors_3d = np.empty((n_kx * n_ky, 3), dtype=np.float32)
+        k_vectors_3d[:, col_first] = k_first.ravel()
+        k_vectors_3d[:, col_second] = k_second.ravel()
+        k_vectors_3d[:, col_fixed] = k_fixed_val
         k_grid_shape = (n_kx, n_ky)
         
         # For k_points (1D representation), return an empty array as it's not directly applicable here.
@@ -184,7 +449,8 @@ class SEDCalculator:
                   basis_atom_types: Optional[Union[List[int], List[List[int]]]] = None,
                   summation_mode: str = 'coherent',
                   k_grid_shape: Optional[Tuple[int, int]] = None,
-                  k_chunk_size: int = 500
+                  k_chunk_size: int = 500,
+                  output_half_spectrum: bool = False
                   ) -> SED:
         
         if summation_mode not in ['coherent', 'incoherent']:
@@ -194,7 +460,7 @@ class SEDCalculator:
         if n_t == 0 or n_atoms_tot == 0:
             logger.warning("Cannot calculate SED: 0 frames or 0 atoms.")
             # Return an empty SED object
-            return SED(np.array([],dtype=np.complex64).reshape(0,0,3), 
+            return SED(np.array([],dtype=self.dtype).reshape(0,0,3), 
                        np.array([],dtype=np.float32), 
                        k_points_mags, 
                        k_vectors_3d,
@@ -202,8 +468,14 @@ class SEDCalculator:
                        is_complex=True, 
                        phase=None)
 
-        mean_pos_all = np.mean(self.traj.positions, axis=0, dtype=np.float32)
-        freqs = np.fft.fftfreq(n_t, d=self.dt_ps) if n_t > 0 else np.array([],dtype=np.float32)
+        mean_pos_all = self.traj.mean_positions
+        # Paths and grids share this kernel: k_vectors_3d is always a flat (n_k, 3) array and
+        # k_grid_shape is only attached to the result, so nothing below branches on it.
+        # output_half_spectrum keeps only the n_t//2+1 non-negative frequencies (what intensity plots show)
+        if output_half_spectrum:
+            freqs = np.fft.rfftfreq(n_t, d=self.dt_ps)
+        else:
+            freqs = np.fft.fftfreq(n_t, d=self.dt_ps)
 
         # Determine atom groups for SED calculation
         atom_groups: List[np.ndarray] = []
@@ -227,7 +499,7 @@ class SEDCalculator:
                  processed_basis_atom_types = [[basis_atom_types]]
 
             for type_group in processed_basis_atom_types:
-                indices = np.where(np.isin(self.traj.types, type_group))[0]
+                indices = self._atom_indices_for_types(type_group)
                 if indices.size > 0:
                     atom_groups.append(indices)
                 else:
@@ -260,71 +532,96 @@ class SEDCalculator:
                     atom_groups.append(grp_idx)
 
         if not atom_groups:
-            logger.debug(f"No specific basis provided or basis resulted in empty groups. Using all {n_atoms_tot} atoms as a single group.")
+            logger.debug("No specific basis provided or basis resulted in empty groups. Using all %d atoms as a single group.", n_atoms_tot)
             atom_groups.append(np.arange(n_atoms_tot))
             if summation_mode == 'incoherent' and n_atoms_tot > 0:
                 logger.info("Using all atoms. Incoherent sum will effectively be a coherent sum of all atoms.")
         
         # --- K-vector chunking logic ---
         num_k_vectors = len(k_vectors_3d)
+        # The kernel works in real_dtype (float32 for complex64) end to end: cast the k-vectors once here
+        # rather than in every k-chunk and atom tile; the SED keeps the caller's array
+        k_vectors_kernel = np.ascontiguousarray(k_vectors_3d, dtype=self.real_dtype)
         # Ensure k_chunk_size is at least 1 and not larger than total k-vectors
         actual_k_chunk_size = min(max(1, k_chunk_size), num_k_vectors) if num_k_vectors > 0 else 1
+        # Cap the chunk so the batched kernel's working set stays within the memory budget
+        n_kernel_atoms = min(n_atoms_tot, sum(grp.size for grp in atom_groups))
+        budget_k_chunk_size = self._max_k_chunk_for_budget(n_kernel_atoms)
+        if budget_k_chunk_size < actual_k_chunk_size:
+            logger.info("Reducing k_chunk_size from %d to %d to fit the %.0f MiB kernel memory budget "
+                        "(SEDCalculator k_chunk_memory_budget_bytes).", actual_k_chunk_size, budget_k_chunk_size,
+                        self.k_chunk_memory_budget_bytes / 1024**2)
+            actual_k_chunk_size = budget_k_chunk_size
         num_chunks = (num_k_vectors + actual_k_chunk_size - 1) // actual_k_chunk_size if num_k_vectors > 0 else 0
 
         # Initialize the full sed_data array based on summation_mode
         is_complex_output: bool
         if summation_mode == 'coherent' or len(atom_groups) <= 1:
-            full_sed_data = np.zeros((len(freqs), num_k_vectors, 3), dtype=np.complex64)
+            # Every k-chunk is assigned below, so only an empty group needs the zero fill
+            full_sed_data = np.empty((len(freqs), num_k_vectors, 3), dtype=self.dtype)
             is_complex_output = True
         else: # incoherent
-            full_sed_data = np.zeros((len(freqs), num_k_vectors), dtype=np.float32) # Store sum of intensities
+            full_sed_data = np.zeros((len(freqs), num_k_vectors), dtype=self.real_dtype) # Store sum of intensities
             is_complex_output = False
 
         if num_k_vectors == 0: # Handle empty k_vectors_3d
             logger.warning("k_vectors_3d is empty. Returning SED object with empty SED data.")
             # Fall through to SED object creation with empty/zero data
 
-        for i_chunk in range(num_chunks):
-            start_idx = i_chunk * actual_k_chunk_size
-            end_idx = min((i_chunk + 1) * actual_k_chunk_size, num_k_vectors)
-            current_k_vectors_chunk = k_vectors_3d[start_idx:end_idx]
-            
-            if current_k_vectors_chunk.shape[0] == 0: continue # Skip if chunk is empty
-
-            logger.debug(f"Processing k-chunk {i_chunk+1}/{num_chunks} (indices {start_idx}-{end_idx-1})")
-
-            if is_complex_output: # Coherent summation
-                if len(atom_groups) > 1:
-                    final_group_indices = np.unique(np.concatenate(atom_groups)).astype(int)
-                elif len(atom_groups) == 1:
-                    final_group_indices = atom_groups[0]
-                else: # Should not happen due to fallback
-                    final_group_indices = np.array([], dtype=int)
-
-                if final_group_indices.size == 0:
-                    logger.warning(f"Final atom group for SED k-chunk {i_chunk+1} is empty. SED chunk will be zero.")
-                    # full_sed_data is already zeros
-                    continue
-                
-                logger.debug(f"  Calculating SED coherently for {len(final_group_indices)} atoms for k-chunk {i_chunk+1}.")
-                sed_chunk_data = self._calculate_sed_for_group(current_k_vectors_chunk, final_group_indices, mean_pos_all)
-                full_sed_data[:, start_idx:end_idx, :] = sed_chunk_data
-            
-            else: # Incoherent summation
-                logger.debug(f"  Calculating SED incoherently for {len(atom_groups)} groups for k-chunk {i_chunk+1}.")
-                # Accumulator for summed intensities for the current chunk (real, positive)
-                summed_intensity_chunk = np.zeros((len(freqs), current_k_vectors_chunk.shape[0]), dtype=np.float32)
-                
-                for i_grp, grp_indices in enumerate(atom_groups):
-                    if grp_indices.size == 0:
-                        logger.debug(f"    Skipping empty atom group {i_grp+1} in k-chunk {i_chunk+1}.")
-                        continue
-                    logger.debug(f"    Calculating for group {i_grp+1}/{len(atom_groups)} with {len(grp_indices)} atoms in k-chunk {i_chunk+1}.")
-                    sed_group_complex_chunk = self._calculate_sed_for_group(current_k_vectors_chunk, grp_indices, mean_pos_all)
-                    # Sum of magnitudes squared for incoherent sum, sum over polarizations
-                    summed_intensity_chunk += np.sum(np.abs(sed_group_complex_chunk)**2, axis=-1) 
-                
-                full_sed_data[:, start_idx:end_idx] = summed_intensity_chunk
+        # The atoms summed coherently: the union of all groups, or each group separately
+        if is_complex_output:
+            if len(atom_groups) > 1:
+                kernel_groups = [np.unique(np.concatenate(atom_groups)).astype(int)]
+            else:
+                kernel_groups = atom_groups[:1]
+        else:
+            kernel_groups = atom_groups
+
+        # Group-outer loop: each group's data is gathered once and streamed through every k-chunk
+        for i_grp, grp_indices in enumerate(kernel_groups):
+            if grp_indices.size == 0:
+                if is_complex_output:
+                    logger.warning("Final atom group for SED is empty. SED will be zero.")
+                    full_sed_data.fill(0)
+                else:
+                    logger.debug("    Skipping empty atom group %d.", i_grp + 1)
+                continue
+            if is_complex_output:
+                logger.debug("  Calculating SED coherently for %d atoms.", len(grp_indices))
+            else:
+                logger.debug("    Calculating for group %d/%d with %d atoms.", i_grp + 1, len(kernel_groups), len(grp_indices))
+            group_data, mean_pos_group = self._prepare_group_data(grp_indices, mean_pos_all,
+                                                                  half_spectrum=output_half_spectrum)
+
+            # Two-stage pipeline: a worker runs the GEMM/FFT of chunk i+1 (BLAS and FFT release the
+            # GIL) while this thread writes chunk i into the output; at most two chunks are alive
+            chunk_bounds = [(i_chunk * actual_k_chunk_size, min((i_chunk + 1) * actual_k_chunk_size, num_k_vectors))
+                            for i_chunk in range(num_chunks)]
+            with ThreadPoolExecutor(max_workers=1) as chunk_executor:
+                def submit_chunk(i_chunk: int):
+                    start_idx, end_idx = chunk_bounds[i_chunk]
+                    logger.debug("Processing k-chunk %d/%d (indices %d-%d)", i_chunk + 1, num_chunks, start_idx, end_idx - 1)
+                    return chunk_executor.submit(self._calculate_sed_for_group, k_vectors_kernel[start_idx:end_idx],
+                                                 group_data, mean_pos_group, is_spectral=output_half_spectrum)
+
+                pending_chunk = submit_chunk(0) if num_chunks > 0 else None
+                for i_chunk, (start_idx, end_idx) in enumerate(chunk_bounds):
+                    sed_chunk_data = pending_chunk.result()
+                    if i_chunk + 1 < num_chunks:
+                        pending_chunk = submit_chunk(i_chunk + 1)
+
+                    if is_complex_output: # Coherent summation
+                        full_sed_data[:, start_idx:end_idx, :] = sed_chunk_data
+                    else: # Incoherent summation
+                        # Sum of |z|^2 over polarizations, accumulated in place one polarization at a time
+                        # as re^2 + im^2: no sqrt and only (t, k)-sized temporaries
+                        intensity_chunk = full_sed_data[:, start_idx:end_idx]
+                        for i_pol in range(sed_chunk_data.shape[-1]):
+                            sed_pol = sed_chunk_data[..., i_pol]
+                            intensity_chunk += sed_pol.real**2
+                            intensity_chunk += sed_pol.imag**2
+                    del sed_chunk_data
+            del group_data
         
         # Construct and return SED object
         return SED(full_sed_data, 
@@ -342,33 +639,35 @@ class SEDCalculator:
             return np.array([], dtype=np.float32).reshape(Z1.shape)
 
         if angle_range_opt == "C": 
-            p1, p2 = np.angle(Z1), np.angle(Z2)
-            delta_p = p1 - p2
-            delta_p = (delta_p + np.pi) % (2*np.pi) - np.pi # Wrap to [-pi, pi]
-            delta_p[delta_p > (np.pi/2)] = np.pi - delta_p[delta_p > (np.pi/2)]   # Fold Q2
-            delta_p[delta_p < (-np.pi/2)] = -np.pi - delta_p[delta_p < (-np.pi/2)] # Fold Q3
-            return delta_p.astype(np.float32)
+            delta_p = np.angle(Z1) - np.angle(Z2)
+            delta_p += np.pi # Wrap to [-pi, pi], in place
+            np.mod(delta_p, 2*np.pi, out=delta_p)
+            delta_p -= np.pi
+            # Branchless fold of Q2/Q3 onto [-pi/2, pi/2]: copysign(pi/2 - |pi/2 - |d||, d),
+            # i.e. pi - d for d > pi/2 and -pi - d for d < -pi/2, in one buffer without masks
+            folded = np.abs(delta_p)
+            folded -= np.pi/2
+            np.abs(folded, out=folded)
+            np.subtract(np.pi/2, folded, out=folded)
+            np.copysign(folded, delta_p, out=folded)
+            return folded.astype(np.float32, copy=False)
+        elif angle_range_opt in ("A", "B"): 
+            # Whole-array form of the per-element dot/cross products of (re, im) pairs
+            prod = Z1 * np.conj(Z2) # real: v1r*v2r + v1i*v2i, imag: v1i*v2r - v1r*v2i
+            m1sq = Z1.real**2 + Z1.imag**2
+            m2sq = Z2.real**2 + Z2.imag**2
+            valid = (m1sq >= 1e-18) & (m2sq >= 1e-18)
+            norm = np.sqrt(m1sq) * np.sqrt(m2sq)
+            norm[~valid] = 1.0
+            if angle_range_opt == "A": 
+                out_phase = np.arccos(np.clip(prod.real / norm, -1.0, 1.0))
+            else: 
+                out_phase = np.arcsin(np.clip(-prod.imag / norm, -1.0, 1.0))
+            out_phase[~valid] = 0.0
+            return out_phase.astype(np.float32)
         else: 
-            nw, nk = Z1.shape
-            out_phase = np.zeros((nw,nk), dtype=np.float32)
-            for i in range(nw):
-                for j in range(nk):
-                    v1r,v1i = Z1[i,j].real, Z1[i,j].imag
-                    v2r,v2i = Z2[i,j].real, Z2[i,j].imag
-                    m1sq,m2sq = v1r**2+v1i**2, v2r**2+v2i**2
-                    if m1sq<1e-18 or m2sq<1e-18: 
-                        angle=0.0
-                    else:
-                        m1,m2 = np.sqrt(m1sq), np.sqrt(m2sq)
-                        if angle_range_opt == "A": 
-                            angle = np.arccos(np.clip((v1r*v2r+v1i*v2i)/(m1*m2), -1.0, 1.0))
-                        elif angle_range_opt == "B": 
-                            angle = np.arcsin(np.clip((v1r*v2i-v1i*v2r)/(m1*m2), -1.0, 1.0))
-                        else: 
-                            logger.warning(f"Unknown angle_range_opt '{angle_range_opt}'. Angle=0.")
-                            angle=0.0
-                    out_phase[i,j] = angle
-            return out_phase
+            logger.warning(f"Unknown angle_range_opt '{angle_range_opt}'. Angle=0.")
+            return np.zeros(Z1.shape, dtype=np.float32)
 
     def ised(self, k_dir_spec: Union[str, int, float, List[float], np.ndarray, Dict[str,float]],
              k_target: float, w_target: float, char_len_k_path: float,
@@ -378,10 +677,17 @@ class SEDCalculator:
              rescale_factor: Union[str, float] = 1.0, n_recon_frames: int = 100,
              dump_filepath: str = "iSED_reconstruction.dump",
              plot_dir_ised: Optional[Path] = None, plot_max_freq: Optional[float] = None,
-             plot_theme: str = 'light'
+             plot_theme: str = 'light', figure_cache: Optional["FigureCache"] = None
              ) -> None:
+        """
+        Reconstruct the atomic motion of one (k, w) mode and write it as an animation dump.
+
+        With plot_dir_ised, the summed input spectrum is also plotted. Pass a
+        visualization.FigureCache as figure_cache to redraw into one Figure across a
+        batch of ised calls (the caller closes it, e.g. by using it as a context manager).
+        """
         logger.info("Starting iSED reconstruction.")
-        avg_pos = np.mean(self.traj.positions, axis=0, dtype=np.float32)
+        avg_pos = self.traj.mean_positions
         sys_atom_types = self.traj.types.astype(int)
         n_atoms_total = self.traj.n_atoms
         k_dir_unit = parse_direction(k_dir_spec)
@@ -409,8 +715,7 @@ class SEDCalculator:
             if isinstance(basis_atom_types_ised[0], list): 
                 logger.info(f"iSED using specified atom type groups: {len(basis_atom_types_ised)} groups.")
                 for type_grp in basis_atom_types_ised:
-                    mask = np.isin(sys_atom_types, type_grp)
-                    grp_idx = np.where(mask)[0]
+                    grp_idx = self._atom_indices_for_types(type_grp)
                     if grp_idx.size > 0: 
                         recon_atom_groups.append(grp_idx)
                     else: 
@@ -418,8 +723,7 @@ class SEDCalculator:
             else: 
                 logger.info(f"iSED using each atom type as a group for types: {basis_atom_types_ised}.")
                 for atom_type_val in basis_atom_types_ised:
-                    mask = np.isin(sys_atom_types, [atom_type_val])
-                    grp_idx = np.where(mask)[0]
+                    grp_idx = self._atom_indices_for_types(atom_type_val)
                     if grp_idx.size > 0: 
                         recon_atom_groups.append(grp_idx)
                     else: 
@@ -440,7 +744,7 @@ class SEDCalculator:
         time_p = np.linspace(0, 2*np.pi, n_recon_frames, endpoint=False)
         pos_proj_k_dir = np.dot(avg_pos, k_dir_unit)
 
-        k_match_idx = np.argmin(np.abs(k_mags_ised - k_target))
+        k_match_idx = nearest_index(k_mags_ised, k_target, assume_sorted=True) # k-path magnitudes ascend
         k_actual = k_mags_ised[k_match_idx]
         logger.info(f"iSED: Target k={k_target:.4f} -> Matched k={k_actual:.4f} (2π/Å, idx {k_match_idx})")
 
@@ -466,44 +770,50 @@ class SEDCalculator:
             freqs_group = sed_object_group.freqs
             # is_complex = sed_object_group.is_complex # Not strictly needed for current logic
             
-            if ised_input_freqs_plot is None: 
-                ised_input_freqs_plot = freqs_group
-            elif not np.array_equal(ised_input_freqs_plot, freqs_group): 
-                logger.warning("iSED group freq arrays differ. Plotting may be inconsistent.")
-
-            grp_intensity = np.sum(np.abs(sed_group_data)**2, axis=-1)
-            if ised_input_intensity_plot is None: 
-                ised_input_intensity_plot = grp_intensity.copy()
-            else:
-                if ised_input_intensity_plot.shape == grp_intensity.shape: 
-                    ised_input_intensity_plot += grp_intensity
-                else: 
-                    logger.warning(f"iSED group intensity shape mismatch (group {i_grp+1}). Skipping accumulation.")
+            # The summed input spectrum only feeds the plot: skip the full-spectrum intensity pass without one
+            if plot_dir_ised:
+                if ised_input_freqs_plot is None: 
+                    ised_input_freqs_plot = freqs_group
+                elif not np.array_equal(ised_input_freqs_plot, freqs_group): 
+                    logger.warning("iSED group freq arrays differ. Plotting may be inconsistent.")
+
+                # Fused per-polarization re^2 + im^2 sum of the group SED (float32, no |z| or complex temporaries)
+                grp_intensity = sed_object_group.intensity
+                if ised_input_intensity_plot is None: 
+                    ised_input_intensity_plot = grp_intensity # Private to this call: becomes the accumulator, no copy
+                else:
+                    if ised_input_intensity_plot.shape == grp_intensity.shape: 
+                        ised_input_intensity_plot += grp_intensity
+                    else: 
+                        logger.warning(f"iSED group intensity shape mismatch (group {i_grp+1}). Skipping accumulation.")
 
-            w_match_idx = np.argmin(np.abs(freqs_group - w_target))
+            w_match_idx = nearest_index(freqs_group, w_target)
             w_actual = freqs_group[w_match_idx]
             logger.info(f"  iSED Group {i_grp+1}: Target ω={w_target:.3f} -> Matched ω={w_actual:.3f} (THz, idx {w_match_idx})")
 
-            if grp_atom_idx.size > 0:
+            if grp_atom_idx.size > 0 and logger.isEnabledFor(logging.DEBUG):
                 logger.debug(f"  DEBUG Group {i_grp+1}: Spatial phase for k={k_actual:.4f} (rad/Å):")
                 for atom_sys_idx in grp_atom_idx[:min(5, len(grp_atom_idx))]: 
                     r_proj = pos_proj_k_dir[atom_sys_idx]
                     spatial_p = k_actual * r_proj
                     logger.debug(f"    Atom SysIdx={atom_sys_idx}, Type={sys_atom_types[atom_sys_idx]}, r_proj={r_proj:.4f}Å, k*r_proj={spatial_p:.4f}rad")
 
-            for pol_ax in range(3):
-                sed_pol_data = sed_group_data[:, :, pol_ax]
-                complex_amp_grp = sed_pol_data[w_match_idx, k_match_idx]
-                proj_pos_grp = pos_proj_k_dir[grp_atom_idx]
-                recon_motion_comp = np.real(complex_amp_grp * np.exp(1j * time_p[:,None] - 1j * k_actual * proj_pos_grp[None,:]))
-                wiggles[:, grp_atom_idx, pol_ax] += recon_motion_comp
+            # Re(A exp(i(ωt - k·r))) = Re(A) cos(ωt - k·r) - Im(A) sin(ωt - k·r): one real cos/sin table of
+            # shape (n_recon_frames, n_grp_atoms) shared by all polarizations, no complex temporaries
+            proj_pos_grp = pos_proj_k_dir[grp_atom_idx]
+            recon_arg_grp = time_p[:,None] - k_actual * proj_pos_grp[None,:]
+            cos_grp, sin_grp = np.cos(recon_arg_grp), np.sin(recon_arg_grp)
+            complex_amp_grp = sed_group_data[w_match_idx, k_match_idx, :] # (3,)
+            wiggles[:, grp_atom_idx, :3] += (cos_grp[:, :, None] * complex_amp_grp.real
+                                             - sin_grp[:, :, None] * complex_amp_grp.imag)
             
             recon_done = True
             if isinstance(rescale_factor, str) and rescale_factor.lower() == "auto":
                 max_amp_grp = np.amax(np.abs(wiggles[:, grp_atom_idx, :3])) if grp_atom_idx.size > 0 else 0.0
                 max_wiggle_amp_all = max(max_wiggle_amp_all, max_amp_grp)
                 if grp_atom_idx.size > 0:
-                    orig_disp_grp = self.traj.positions[:, grp_atom_idx,:] - avg_pos[None, grp_atom_idx,:]
+                    orig_disp_grp = self.traj.positions[:, grp_atom_idx,:]
+                    orig_disp_grp -= avg_pos[None, grp_atom_idx,:]
                     std_dev_sum += np.std(orig_disp_grp) * len(grp_atom_idx)
                     n_atoms_recon_sum += len(grp_atom_idx)
 
@@ -534,57 +844,74 @@ class SEDCalculator:
         atom_types_dump = wiggles[0,:,3].astype(int) # Ensure types are integer for dump
         
         # Pass the full box_matrix for correct triclinic box representation
-        out_to_qdump(dump_filepath, final_pos_dump, atom_types_dump, self.traj.box_matrix)
+        if not plot_dir_ised:
+            out_to_qdump(dump_filepath, final_pos_dump, atom_types_dump, self.traj.box_matrix)
+            logger.info(f"iSED reconstruction saved: {dump_filepath}")
+            return
+        # Write the dump on a worker thread so its formatting and disk I/O overlap the input-spectrum plot
+        with ThreadPoolExecutor(max_workers=1) as dump_executor:
+            dump_future = dump_executor.submit(out_to_qdump, dump_filepath, final_pos_dump, atom_types_dump,
+                                               self.traj.box_matrix)
+            self._plot_ised_input(ised_input_intensity_plot, ised_input_freqs_plot, k_mags_ised, k_vecs_ised,
+                                  k_dir_spec, k_target, w_target, k_actual, plot_dir_ised, plot_max_freq, plot_theme,
+                                  figure_cache)
+            dump_future.result() # Re-raise any dump error
         logger.info(f"iSED reconstruction saved: {dump_filepath}")
 
-        if plot_dir_ised and ised_input_intensity_plot is not None and ised_input_freqs_plot is not None:
-            logger.info("Plotting iSED input spectrum (incoherently summed groups).")
-            ised_mock_sed_plot = np.zeros((*ised_input_intensity_plot.shape, 3), dtype=np.complex64)
-            ised_mock_sed_plot[:,:,0] = np.sqrt(ised_input_intensity_plot + 1e-20) # Store in first pol for SED object structure
-            ised_plot_obj = SED(sed=ised_mock_sed_plot, freqs=ised_input_freqs_plot,
-                                k_points=k_mags_ised, k_vectors=k_vecs_ised,
-                                is_complex=True) # Mock SED is technically complex here, intensity handled by plotter
-            
-            # --- Filename Generation --- 
-            k_dir_str = ""
-            if isinstance(k_dir_spec, str):
-                k_dir_str = k_dir_spec.replace(" ","_").replace("/", "-")
-            elif isinstance(k_dir_spec, (list, tuple, np.ndarray)):
-                arr = np.asarray(k_dir_spec)
-                k_dir_str = f"({','.join([f'{x:.2f}' for x in arr])})"
-            elif isinstance(k_dir_spec, dict):
-                k_dir_str = f"(h{k_dir_spec.get('h',0)}_k{k_dir_spec.get('k',0)}_l{k_dir_spec.get('l',0)})"
-            else:
-                k_dir_str = str(k_dir_spec)
-            k_dir_str = k_dir_str.replace("[", "").replace("]", "").replace("(", "").replace(")", "") # Clean common brackets
-
-            k_target_str = f"{k_target:.2f}".replace('.','p')
-            w_target_str = f"{w_target:.2f}".replace('.','p')
-            
-            # New filename pattern:
-            ised_plot_fname = plot_dir_ised / f"iSED_{k_dir_str}_{k_target_str}_{w_target_str}.png"
-            # Old filename pattern for reference (was more complex):
-            # ised_plot_fname = plot_dir_ised / f"ised_input_sed_{ised_k_dir_label}_k{k_str}_w{w_str}_inc_sum.png"
-            
-            w_match_plot_idx = np.argmin(np.abs(ised_input_freqs_plot - w_target))
-            w_actual_plot = ised_input_freqs_plot[w_match_plot_idx]
-            hl_info = {'k_point_target':k_actual, 'freq_point_target':w_actual_plot}
-            
-            max_freq_ised_plot = plot_max_freq
-            if max_freq_ised_plot is None and ised_input_freqs_plot.size > 0:
-                 max_freq_ised_plot = np.max(ised_input_freqs_plot)
-            
-            plot_args_ised = {
-                'title': f"Summed iSED Input Spectrum (k≈{k_actual:.3f}, ω≈{w_actual_plot:.3f})",
-                'direction_label': k_dir_str, # Use the formatted k_dir_str for label consistency
-                'highlight_region': hl_info,
-                'max_freq': max_freq_ised_plot,
-                'intensity_scale': 'sqrt',
-                'theme': plot_theme  # Pass theme to SEDPlotter
-            }
-            SEDPlotter(ised_plot_obj, '2d_intensity', str(ised_plot_fname), **plot_args_ised).generate_plot()
-            logger.info(f"iSED input spectrum plot saved: {ised_plot_fname.name}")
-        elif plot_dir_ised:
+    def _plot_ised_input(self, ised_input_intensity_plot: Optional[np.ndarray], ised_input_freqs_plot: Optional[np.ndarray],
+                         k_mags_ised: np.ndarray, k_vecs_ised: np.ndarray,
+                         k_dir_spec: Union[str, int, float, List[float], np.ndarray, Dict[str,float]],
+                         k_target: float, w_target: float, k_actual: float,
+                         plot_dir_ised: Optional[Path], plot_max_freq: Optional[float], plot_theme: str,
+                         figure_cache: Optional["FigureCache"] = None) -> None:
+        """Plot the incoherently summed iSED input spectrum, if plot_dir_ised is set."""
+        if not plot_dir_ised:
+            return
+        if ised_input_intensity_plot is None or ised_input_freqs_plot is None:
             logger.warning("iSED plot requested, but no combined SED data available.")
+            return
+        logger.info("Plotting iSED input spectrum (incoherently summed groups).")
+        # The summed intensity is a private accumulator: offset it in place and hand the float32 array
+        # straight to the plotter as a non-complex SED (no complex amplitude copy)
+        np.add(ised_input_intensity_plot, np.float32(1e-20), out=ised_input_intensity_plot)
+        ised_plot_obj = SED.from_intensity(ised_input_intensity_plot, ised_input_freqs_plot, k_mags_ised, k_vecs_ised)
+        
+        # --- Filename Generation --- 
+        k_dir_str = _format_k_dir_spec(k_dir_spec)
+
+        k_target_str = f"{k_target:.2f}".translate(_DOT_TO_P)
+        w_target_str = f"{w_target:.2f}".translate(_DOT_TO_P)
+        
+        # New filename pattern:
+        ised_plot_fname = plot_dir_ised / _ISED_FNAME_FMT.format(k_dir_str, k_target_str, w_target_str)
+        # Old filename pattern for reference (was more complex):
+        # ised_plot_fname = plot_dir_ised / f"ised_input_sed_{ised_k_dir_label}_k{k_str}_w{w_str}_inc_sum.png"
+        
+        w_match_plot_idx = nearest_index(ised_input_freqs_plot, w_target)
+        w_actual_plot = ised_input_freqs_plot[w_match_plot_idx]
+        hl_info = {'k_point_target':k_actual, 'freq_point_target':w_actual_plot}
+        
+        max_freq_ised_plot = plot_max_freq
+        if max_freq_ised_plot is None and ised_input_freqs_plot.size > 0:
+             # O(1) from the FFT frequency layout: ascending (rfftfreq) peaks at the end,
+             # fftfreq order peaks at the last non-negative bin, (n-1)//2
+             if ised_input_freqs_plot[-1] >= ised_input_freqs_plot[0]:
+                 max_freq_ised_plot = ised_input_freqs_plot[-1]
+             else:
+                 max_freq_ised_plot = ised_input_freqs_plot[(ised_input_freqs_plot.size - 1) // 2]
+        
+        plot_args_ised = {
+            'title': f"Summed iSED Input Spectrum (k≈{k_actual:.3f}, ω≈{w_actual_plot:.3f})",
+            'direction_label': k_dir_str, # Use the formatted k_dir_str for label consistency
+            'highlight_region': hl_info,
+            'max_freq': max_freq_ised_plot,
+            'intensity_scale': 'sqrt',
+            'theme': plot_theme  # Pass theme to SEDPlotter
+        }
+        from ..visualization import SEDPlotter # Deferred: only iSED plotting needs matplotlib
+        # With the caller's figure_cache, a batch of iSED targets redraws into one Figure
+        SEDPlotter(ised_plot_obj, '2d_intensity', str(ised_plot_fname), figure_cache=figure_cache,
+                   **plot_args_ised).generate_plot()
+        logger.info("iSED input spectrum plot saved: %s", ised_plot_fname.name)
 
 
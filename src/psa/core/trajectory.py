@@ -2,6 +2,7 @@
 Core trajectory data structure for molecular dynamics data.
 """
 from dataclasses import dataclass
+from functools import cached_property
 import numpy as np
 from typing import Optional
 
@@ -17,6 +18,11 @@ class Trajectory:
     dt_ps: float # Timestep in picoseconds
 
     def __post_init__(self):
+        # Keep the per-frame data as single C-contiguous float32 (frames, atoms, xyz) buffers so
+        # slices feed BLAS/FFT directly; arrays that already qualify (incl. memmaps) are not copied.
+        self.positions = self._as_contiguous(self.positions, np.float32)
+        self.velocities = self._as_contiguous(self.velocities, np.float32)
+        self.types = self._as_contiguous(self.types, np.int32)
         if self.positions.ndim != 3 or self.positions.shape[2] != 3:
             raise ValueError("Positions must be 3D (frames, atoms, xyz) and last dimension must be 3.")
         if self.velocities.ndim != 3 or self.velocities.shape[2] != 3:
@@ -36,10 +42,21 @@ class Trajectory:
         if self.box_tilts.shape != (3,):
             raise ValueError(f"Box tilts must be a 3-element array, got {self.box_tilts.shape}")
 
+    @staticmethod
+    def _as_contiguous(arr: np.ndarray, dtype) -> np.ndarray:
+        if isinstance(arr, np.ndarray) and arr.dtype == dtype and arr.flags.c_contiguous:
+            return arr
+        return np.ascontiguousarray(arr, dtype=dtype)
+
     @property
     def n_frames(self) -> int:
         return len(self.timesteps)
 
     @property
     def n_atoms(self) -> int:
-        return len(self.types) 
\ No newline at end of file
+        return len(self.types)
+
+    @cached_property
+    def mean_positions(self) -> np.ndarray:
+        """Time-averaged atom positions, shape (atoms, 3); computed once per trajectory."""
+        return np.mean(self.positions, axis=0, dtype=np.float32)
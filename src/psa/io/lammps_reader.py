@@ -0,0 +1,194 @@
+"""
+Native reader for LAMMPS text dump files.
+
+Parses `dump custom`/`dump atom` text trajectories with NumPy only: the file
+is read in one call (memory-mapped when very large), frame headers are located
+by byte search and every atom block is converted in one C-level call into
+preallocated float32 arrays, so no OVITO pipeline is needed for plain numeric dumps.
+Coordinates are returned unwrapped, matching OVITO's UnwrapTrajectoriesModifier.
+"""
+import numpy as np
+import mmap
+import warnings
+import logging
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Dumps up to this size are slurped with a single read; larger ones are memory-mapped
+READ_BYTES_MAX_SIZE = 1 << 30
+
+# Coordinate column triples in order of preference, with (scaled, unwrapped) flags
+_COORD_COLUMNS = [
+    (('xu', 'yu', 'zu'), False, True),
+    (('xsu', 'ysu', 'zsu'), True, True),
+    (('x', 'y', 'z'), False, False),
+    (('xs', 'ys', 'zs'), True, False),
+]
+
+def _parse_box(bounds_line: str, bound_rows: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert a LAMMPS BOX BOUNDS header into cell matrix, origin and periodicity.
+
+    Returns:
+        h_matrix (3x3, columns are the cell vectors a, b, c as in OVITO's cell.matrix),
+        origin (3,), periodic flags (3,) bool
+    """
+    tokens = bounds_line.split()[3:]
+    is_triclinic = tokens[:3] == ['xy', 'xz', 'yz']
+    boundary = tokens[3:] if is_triclinic else tokens
+    periodic = np.array([b == 'pp' for b in boundary] if len(boundary) == 3 else [True] * 3)
+    rows = np.array([row.split()[:3 if is_triclinic else 2] for row in bound_rows], dtype=np.float64)
+
+    xy, xz, yz = (rows[0, 2], rows[1, 2], rows[2, 2]) if is_triclinic else (0.0, 0.0, 0.0)
+    xlo = rows[0, 0] - min(0.0, xy, xz, xy + xz)
+    xhi = rows[0, 1] - max(0.0, xy, xz, xy + xz)
+    ylo = rows[1, 0] - min(0.0, yz)
+    yhi = rows[1, 1] - max(0.0, yz)
+    zlo, zhi = rows[2, 0], rows[2, 1]
+
+    h_matrix = np.array([[xhi - xlo, xy, xz],
+                         [0.0, yhi - ylo, yz],
+                         [0.0, 0.0, zhi - zlo]])
+    return h_matrix, np.array([xlo, ylo, zlo]), periodic
+
+def _frame_offsets(buf: Union[bytes, mmap.mmap]) -> List[int]:
+    """Byte offsets of every 'ITEM: TIMESTEP' header."""
+    offsets, pos = [], buf.find(b'ITEM: TIMESTEP')
+    while pos != -1:
+        offsets.append(pos)
+        pos = buf.find(b'ITEM: TIMESTEP', pos + 1)
+    return offsets
+
+def _parse_header(buf: Union[bytes, mmap.mmap], start: int, end: int, i_fr: int) -> Tuple[int, int, List[str], List[str], int]:
+    """Timestep, atom count, box header lines, atom columns and the end of the ATOMS line of one frame."""
+    atoms_item = buf.find(b'ITEM: ATOMS', start, end)
+    if atoms_item == -1:
+        raise ValueError(f"Frame {i_fr} has no 'ITEM: ATOMS' section.")
+    atoms_line_end = buf.find(b'\n', atoms_item, end)
+    if atoms_line_end == -1:
+        atoms_line_end = end
+    header = buf[start:atoms_line_end].decode('ascii').splitlines()
+    items = {line.split(':')[1].split()[0]: i for i, line in enumerate(header) if line.startswith('ITEM:')}
+    if not {'TIMESTEP', 'NUMBER', 'BOX', 'ATOMS'} <= items.keys():
+        raise ValueError(f"Frame {i_fr} header is incomplete.")
+    i_box = items['BOX']
+    return (int(header[items['TIMESTEP'] + 1]), int(header[items['NUMBER'] + 1]),
+            header[i_box:i_box + 4], header[items['ATOMS']].split()[2:], atoms_line_end)
+
+def _parse_buffer(buf: Union[bytes, mmap.mmap]) -> Dict[str, np.ndarray]:
+    offsets = _frame_offsets(buf)
+    if not offsets:
+        raise ValueError("No 'ITEM: TIMESTEP' headers found; not a LAMMPS text dump.")
+    offsets.append(len(buf))
+    n_frames = len(offsets) - 1
+
+    # Frame 0 fixes the atom count and columns, so the float32 outputs are allocated once and
+    # filled frame by frame; only one frame's float64 block is alive at a time
+    _, n_atoms, _, columns, _ = _parse_header(buf, offsets[0], offsets[1], 0)
+    col = {name: i for i, name in enumerate(columns)}
+    for names, scaled, unwrapped in _COORD_COLUMNS:
+        if all(n in col for n in names):
+            coord_cols = [col[n] for n in names]
+            break
+    else:
+        raise ValueError(f"No coordinate columns found in {columns}.")
+    image_cols = [col[n] for n in ('ix', 'iy', 'iz')] if all(n in col for n in ('ix', 'iy', 'iz')) else None
+    has_velocities = all(n in col for n in ('vx', 'vy', 'vz'))
+    vel_cols = [col[n] for n in ('vx', 'vy', 'vz')] if has_velocities else None
+
+    positions = np.empty((n_frames, n_atoms, 3), dtype=np.float32)
+    velocities = np.empty_like(positions) if has_velocities else np.zeros_like(positions)
+    timesteps = np.empty(n_frames, dtype=np.int64)
+    ids_ref = types = h_first = None
+    # Without image flags, boundary crossings are detected from frame-to-frame jumps in reduced
+    # coordinates (minimum image), as OVITO does, and accumulated as integer shifts
+    prev_reduced, shifts = None, None
+
+    for i_fr in range(n_frames):
+        start, end = offsets[i_fr], offsets[i_fr + 1]
+        timesteps[i_fr], n_atoms_fr, box_lines, frame_columns, atoms_line_end = _parse_header(buf, start, end, i_fr)
+        if frame_columns != columns:
+            raise ValueError(f"Frame {i_fr} columns {frame_columns} differ from frame 0 columns {columns}.")
+        if n_atoms_fr != n_atoms:
+            raise ValueError(f"Frame {i_fr} has {n_atoms_fr} atoms, frame 0 has {n_atoms}.")
+        h_matrix, origin, periodic = _parse_box(box_lines[0], box_lines[1:])
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            values = np.fromstring(buf[atoms_line_end + 1:end], sep=' ')
+        if values.size != n_atoms * len(columns):
+            raise ValueError(f"Frame {i_fr}: expected {n_atoms}x{len(columns)} numeric values, got {values.size} "
+                             "(non-numeric columns or truncated frame).")
+        data = values.reshape(n_atoms, len(columns))
+
+        # Atoms keep frame 0's file order (as OVITO does); later frames are matched to it by id
+        if 'id' in col:
+            ids = data[:, col['id']]
+            if ids_ref is None:
+                ids_ref = ids.copy()
+            elif not np.array_equal(ids, ids_ref):
+                sorter = np.argsort(ids, kind='stable')
+                order = sorter[np.clip(np.searchsorted(ids[sorter], ids_ref), 0, n_atoms - 1)]
+                if not np.array_equal(ids[order], ids_ref):
+                    raise ValueError(f"Frame {i_fr} atom ids differ from frame 0.")
+                data = data[order]
+        if i_fr == 0:
+            h_first = h_matrix
+            types = data[:, col['type']].astype(np.int32) if 'type' in col else np.ones(n_atoms, dtype=np.int32)
+
+        coords = data[:, coord_cols]
+        if scaled:
+            coords = origin + coords @ h_matrix.T
+        if not unwrapped:
+            if image_cols is not None:
+                coords += data[:, image_cols] @ h_matrix.T
+            elif n_frames > 1:
+                reduced = (coords - origin) @ np.linalg.inv(h_matrix).T
+                if prev_reduced is None:
+                    shifts = np.zeros_like(reduced)
+                else:
+                    shifts -= np.rint(reduced - prev_reduced)
+                    shifts[:, ~periodic] = 0.0
+                    coords += shifts @ h_matrix.T
+                prev_reduced = reduced
+        positions[i_fr] = coords
+        if has_velocities:
+            velocities[i_fr] = data[:, vel_cols]
+
+    return {
+        'positions': positions,
+        'velocities': velocities,
+        'types': types,
+        'box_matrix': h_first.astype(np.float32),
+        'timesteps': timesteps,
+        'has_velocities': has_velocities,
+    }
+
+def read_lammps_dump(filepath: Union[str, Path]) -> Dict[str, np.ndarray]:
+    """
+    Read a LAMMPS text dump into unwrapped per-frame arrays.
+
+    Args:
+        filepath: Path to the dump file
+
+    Returns:
+        Dict with 'positions' and 'velocities' (n_frames, n_atoms, 3) float32
+        (velocities are zeros when the dump has no vx/vy/vz), 'types' (n_atoms,)
+        int32, 'box_matrix' (3, 3) float32 of the first frame, 'timesteps' and
+        'has_velocities'. Atoms keep the file order of frame 0, as with OVITO; later
+        frames are matched to it by id when an id column is present.
+
+    Raises:
+        ValueError: If the file is not a purely numeric LAMMPS text dump
+    """
+    filepath = Path(filepath)
+    file_size = filepath.stat().st_size
+    if file_size == 0:
+        raise ValueError(f"Empty trajectory file: {filepath.name}")
+    if file_size <= READ_BYTES_MAX_SIZE:
+        return _parse_buffer(filepath.read_bytes())
+    with open(filepath, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return _parse_buffer(buf)
@@ -4,15 +4,18 @@ Trajectory loading and processing module.
 import numpy as np
 from pathlib import Path
 import logging
-from typing import Optional
+from typing import Optional, Tuple
 from tqdm import tqdm
 import threading
 import subprocess
 import sys
 import tempfile
-import pickle
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from ..core.trajectory import Trajectory
+from .lammps_reader import read_lammps_dump
 
 # Try to import OVITO, but don't fail if it's not available
 try:
@@ -25,10 +28,16 @@ except ImportError as e:
 
 logger = logging.getLogger(__name__)
 
+# On-disk dtype of the cached displacements (<stem>.displacements.npy)
+DISPLACEMENTS_DTYPE = np.float16
+
 class TrajectoryLoader:
-    def __init__(self, filename: str, dt: float = 1.0, file_format: str = 'auto'):
+    def __init__(self, filename: str, dt: float = 1.0, file_format: str = 'auto',
+                 n_workers: Optional[int] = 1):
         if dt <= 0:
             raise ValueError("dt (timestep size) must be positive.")
+        if n_workers is not None and n_workers < 1:
+            raise ValueError("n_workers must be >= 1 (or None to use all CPU cores).")
         self.filepath = Path(filename)
         if not self.filepath.exists():
             raise FileNotFoundError(f"Trajectory file not found: {filename}")
@@ -37,6 +46,8 @@ class TrajectoryLoader:
         if file_format not in valid_formats:
             raise ValueError(f"Unsupported file format. Must be one of: {valid_formats}")
         self.file_format = file_format
+        # Number of threads fetching OVITO frames; each thread owns its own pipeline.
+        self.n_workers = n_workers if n_workers is not None else (os.cpu_count() or 1)
 
     def _detect_file_format(self) -> str:
         if self.file_format != 'auto':
@@ -56,8 +67,11 @@ class TrajectoryLoader:
         if all(f.exists() for f in npy_files.values()):
             logger.info(f"Loading trajectory from cached .npy files for {self.filepath.name}.")
             try:
-                pos = np.load(npy_files['positions'])
-                vel = np.load(npy_files['velocities'])
+                # Memory-map the large per-frame arrays: pages are read on demand and shared via the
+                # OS page cache across runs. Trajectory.positions/velocities are then read-only np.memmap
+                # views, so callers must copy before modifying them in place.
+                pos = np.load(npy_files['positions'], mmap_mode='r')
+                vel = np.load(npy_files['velocities'], mmap_mode='r')
                 atom_types = np.load(npy_files['types'])
                 box_mat = np.load(npy_files['box_matrix'])
 
@@ -75,9 +89,38 @@ class TrajectoryLoader:
             except Exception as e:
                 logger.warning(f"Loading .npy cache failed: {e}. Falling back to OVITO.")
 
+        if self._detect_file_format() == 'lammps':
+            try:
+                return self._load_lammps_native()
+            except Exception as e:
+                logger.warning(f"Native LAMMPS dump reader failed: {e}. Falling back to OVITO.")
+
         logger.info(f"No complete .npy cache for {self.filepath.name}; loading via OVITO.")
         return self._load_via_ovito()
 
+    def _load_lammps_native(self) -> Trajectory:
+        """Parse a numeric LAMMPS text dump directly with NumPy (no OVITO pipeline)."""
+        logger.info(f"Loading/unwrapping '{self.filepath.name}' with the native LAMMPS dump reader.")
+        data = read_lammps_dump(self.filepath)
+        if not data['has_velocities']:
+            logger.warning("LAMMPS dump: No velocity data found. Velocities set to zero.")
+
+        h_matrix = data['box_matrix']
+        box_len = np.array([h_matrix[0,0], h_matrix[1,1], h_matrix[2,2]], dtype=np.float32)
+        box_tilt = np.array([h_matrix[0,1], h_matrix[0,2], h_matrix[1,2]], dtype=np.float32)
+        n_frames, n_atoms = data['positions'].shape[:2]
+        ts_arr = np.arange(n_frames, dtype=np.float32) * self.dt
+        logger.info(f"Trajectory '{self.filepath.name}' loaded natively: {n_frames} frames, {n_atoms} atoms.")
+
+        trajectory = Trajectory(data['positions'], data['velocities'], data['types'], ts_arr,
+                                box_matrix=h_matrix, box_lengths=box_len, box_tilts=box_tilt,
+                                dt_ps=self.dt)
+        try:
+            self.save_trajectory_npy(trajectory)
+        except Exception as e:
+            logger.warning(f"Failed to save .npy cache for {self.filepath.name}: {e}")
+        return trajectory
+
     def _load_via_ovito(self) -> Trajectory:
         # Check if we're running on the main thread (important for macOS compatibility)
         if threading.current_thread() != threading.main_thread():
@@ -117,7 +160,7 @@ class TrajectoryLoader:
         logger.info("Using subprocess OVITO loading to avoid GUI framework conflicts")
         
         # Create a temporary file for data transfer
-        with tempfile.NamedTemporaryFile(suffix='.pkl', delete=False) as temp_file:
+        with tempfile.NamedTemporaryFile(suffix='.npz', delete=False) as temp_file:
             temp_path = temp_file.name
         
         try:
@@ -135,7 +178,6 @@ os.chdir(r"{current_dir}")
 
 import numpy as np
 from pathlib import Path
-import pickle
 
 def subprocess_ovito_loader(filepath, ovito_fmt, dt, output_file):
     try:
@@ -172,14 +214,14 @@ def subprocess_ovito_loader(filepath, ovito_fmt, dt, output_file):
                 continue
             
             if hasattr(frame_data.particles, 'positions') and frame_data.particles.positions is not None:
-                frame_pos = np.array(frame_data.particles.positions, dtype=np.float32)
+                frame_pos = np.asarray(frame_data.particles.positions)
                 if frame_pos.shape == (n_atoms, 3): 
-                    pos_all[i] = frame_pos
+                    np.copyto(pos_all[i], frame_pos, casting='same_kind')
 
             if has_vel and hasattr(frame_data.particles, 'velocities') and frame_data.particles.velocities is not None:
-                frame_vel = np.array(frame_data.particles.velocities, dtype=np.float32)
+                frame_vel = np.asarray(frame_data.particles.velocities)
                 if frame_vel.shape == (n_atoms, 3): 
-                    vel_all[i] = frame_vel
+                    np.copyto(vel_all[i], frame_vel, casting='same_kind')
 
         types_data = frame0_data.particles.particle_types if hasattr(frame0_data.particles, 'particle_types') and frame0_data.particles.particle_types is not None else None
         if types_data is not None and len(types_data) == n_atoms:
@@ -200,8 +242,9 @@ def subprocess_ovito_loader(filepath, ovito_fmt, dt, output_file):
             'dt': dt
         }}
         
+        # Raw .npz (no pickling): the parent reads each array back as one contiguous buffer
         with open(output_file, 'wb') as f:
-            pickle.dump(trajectory_data, f)
+            np.savez(f, **trajectory_data)
             
         return 0
         
@@ -227,8 +270,11 @@ sys.exit(exit_code)
             if not Path(temp_path).exists():
                 raise RuntimeError(f"Subprocess did not create output file: {temp_path}")
                 
-            with open(temp_path, 'rb') as f:
-                trajectory_data = pickle.load(f)
+            with np.load(temp_path) as npz:
+                trajectory_data = {key: npz[key] for key in npz.files}
+            trajectory_data['n_frames'] = int(trajectory_data['n_frames'])
+            trajectory_data['n_atoms'] = int(trajectory_data['n_atoms'])
+            trajectory_data['dt'] = float(trajectory_data['dt'])
             
             # Create Trajectory object
             box_len = np.array([trajectory_data['box_matrix'][0,0], 
@@ -274,8 +320,7 @@ sys.exit(exit_code)
             raise ImportError("OVITO is not available. Please install OVITO Python to load trajectory files without .npy cache.")
         
         try:
-            pipeline = import_file(str(self.filepath), input_format=ovito_fmt)
-            pipeline.modifiers.append(UnwrapTrajectoriesModifier())
+            pipeline = self._create_ovito_pipeline(ovito_fmt)
         except Exception as e:
             logger.error(f"OVITO failed to load file '{self.filepath.name}': {e}")
             raise RuntimeError(f"OVITO import failed: {e}. This may be due to threading issues on macOS or file format problems.")
@@ -310,32 +355,25 @@ sys.exit(exit_code)
         box_len = np.array([h_matrix[0,0], h_matrix[1,1], h_matrix[2,2]], dtype=np.float32)
         box_tilt = np.array([h_matrix[0,1], h_matrix[0,2], h_matrix[1,2]], dtype=np.float32)
         
-        for i in tqdm(range(n_frames), desc=f"Loading OVITO frames from {self.filepath.name}", unit="fr"):
-            try:
-                frame_data = pipeline.compute(i)
-            except Exception as e:
-                logger.error(f"OVITO failed to compute frame {i}: {e}")
-                continue
-                
-            if not (frame_data and hasattr(frame_data, 'particles') and frame_data.particles):
-                logger.error(f"OVITO: Could not compute frame {i}. Data will be zero.")
-                continue
-            
-            if hasattr(frame_data.particles, 'positions') and frame_data.particles.positions is not None:
-                 frame_pos = np.array(frame_data.particles.positions, dtype=np.float32)
-                 if frame_pos.shape == (n_atoms, 3): 
-                     pos_all[i] = frame_pos
-                 else: 
-                     logger.warning(f"OVITO: Pos shape mismatch frame {i}. Expected ({n_atoms},3), got {frame_pos.shape}.")
-            else: 
-                logger.warning(f"OVITO: No position data frame {i}.")
-
-            if has_vel and hasattr(frame_data.particles, 'velocities') and frame_data.particles.velocities is not None:
-                frame_vel = np.array(frame_data.particles.velocities, dtype=np.float32)
-                if frame_vel.shape == (n_atoms, 3): 
-                    vel_all[i] = frame_vel
-                else: 
-                    logger.warning(f"OVITO: Vel shape mismatch frame {i}. Expected ({n_atoms},3), got {frame_vel.shape}.")
+        if self.n_workers > 1 and n_frames > 1:
+            # OVITO pipelines are not safe to share between threads, so every worker
+            # thread lazily builds its own; frames are written into the shared buffers by index.
+            thread_state = threading.local()
+
+            def load_frame(i: int) -> None:
+                if not hasattr(thread_state, 'pipeline'):
+                    thread_state.pipeline = self._create_ovito_pipeline(ovito_fmt)
+                self._copy_ovito_frame(thread_state.pipeline, i, n_atoms, has_vel, pos_all, vel_all)
+
+            logger.info(f"Fetching OVITO frames with {self.n_workers} worker threads.")
+            with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+                futures = [executor.submit(load_frame, i) for i in range(n_frames)]
+                for future in tqdm(as_completed(futures), total=n_frames,
+                                   desc=f"Loading OVITO frames from {self.filepath.name}", unit="fr"):
+                    future.result()
+        else:
+            for i in tqdm(range(n_frames), desc=f"Loading OVITO frames from {self.filepath.name}", unit="fr"):
+                self._copy_ovito_frame(pipeline, i, n_atoms, has_vel, pos_all, vel_all)
 
         types_data = frame0_data.particles.particle_types if hasattr(frame0_data.particles, 'particle_types') and frame0_data.particles.particle_types is not None else None
         if types_data is not None and len(types_data) == n_atoms:
@@ -360,6 +398,42 @@ sys.exit(exit_code)
             
         return trajectory_from_ovito
 
+    def _create_ovito_pipeline(self, ovito_fmt: Optional[str]):
+        """Create an OVITO pipeline for the trajectory with unwrapping applied."""
+        pipeline = import_file(str(self.filepath), input_format=ovito_fmt)
+        pipeline.modifiers.append(UnwrapTrajectoriesModifier())
+        return pipeline
+
+    def _copy_ovito_frame(self, pipeline, i: int, n_atoms: int, has_vel: bool,
+                          pos_all: np.ndarray, vel_all: np.ndarray) -> None:
+        """Compute frame i with OVITO and copy its particle data into the preallocated buffers."""
+        try:
+            frame_data = pipeline.compute(i)
+        except Exception as e:
+            logger.error(f"OVITO failed to compute frame {i}: {e}")
+            return
+            
+        if not (frame_data and hasattr(frame_data, 'particles') and frame_data.particles):
+            logger.error(f"OVITO: Could not compute frame {i}. Data will be zero.")
+            return
+        
+        if hasattr(frame_data.particles, 'positions') and frame_data.particles.positions is not None:
+             # View OVITO's buffer and cast straight into the preallocated frame (no temporary)
+             frame_pos = np.asarray(frame_data.particles.positions)
+             if frame_pos.shape == (n_atoms, 3): 
+                 np.copyto(pos_all[i], frame_pos, casting='same_kind')
+             else: 
+                 logger.warning(f"OVITO: Pos shape mismatch frame {i}. Expected ({n_atoms},3), got {frame_pos.shape}.")
+        else: 
+            logger.warning(f"OVITO: No position data frame {i}.")
+
+        if has_vel and hasattr(frame_data.particles, 'velocities') and frame_data.particles.velocities is not None:
+            frame_vel = np.asarray(frame_data.particles.velocities)
+            if frame_vel.shape == (n_atoms, 3): 
+                np.copyto(vel_all[i], frame_vel, casting='same_kind')
+            else: 
+                logger.warning(f"OVITO: Vel shape mismatch frame {i}. Expected ({n_atoms},3), got {frame_vel.shape}.")
+
     def save_trajectory_npy(self, traj: Trajectory) -> None:
         cache_stem = self.filepath.parent / self.filepath.stem
         npy_files = {
@@ -380,8 +454,57 @@ sys.exit(exit_code)
         np.save(npy_files['types'], traj.types)
         np.save(npy_files['box_matrix'], traj.box_matrix)
 
-        mean_pos = np.mean(traj.positions, axis=0)
-        disp = traj.positions - mean_pos[None, :, :] 
+        mean_pos = traj.mean_positions
         np.save(cache_stem.with_suffix('.mean_positions.npy'), mean_pos)
-        np.save(cache_stem.with_suffix('.displacements.npy'), disp)
-        logger.info(f"Trajectory data for {self.filepath.name} saved to .npy.") 
\ No newline at end of file
+        # Displacements are small thermal deviations, so they are stored lossy in float16;
+        # the exact positions cache above is what load() uses.
+        disp_stored, max_abs_error = self._quantized_displacements(traj.positions, mean_pos)
+        np.save(cache_stem.with_suffix('.displacements.npy'), disp_stored)
+        disp_header = {
+            'dtype': np.dtype(DISPLACEMENTS_DTYPE).name,
+            'source_dtype': np.result_type(traj.positions, mean_pos).name,
+            'shape': list(disp_stored.shape),
+            'max_abs_error': max_abs_error,
+        }
+        with open(cache_stem.with_suffix('.displacements.json'), 'w') as f:
+            json.dump(disp_header, f, indent=2)
+        logger.info(f"Trajectory data for {self.filepath.name} saved to .npy.")
+
+    @staticmethod
+    def _quantized_displacements(positions: np.ndarray, mean_pos: np.ndarray,
+                                 frames_per_block: int = 256) -> Tuple[np.ndarray, float]:
+        """
+        Compute positions - mean_pos directly into a DISPLACEMENTS_DTYPE array.
+        
+        Works through blocks of frames with one reused scratch buffer, so no
+        full-size float32 displacement array is ever allocated. Returns the
+        quantized displacements and the max absolute quantization error.
+        """
+        n_frames = positions.shape[0]
+        disp_stored = np.empty(positions.shape, dtype=DISPLACEMENTS_DTYPE)
+        scratch = np.empty((min(frames_per_block, n_frames),) + positions.shape[1:],
+                           dtype=np.result_type(positions, mean_pos))
+        max_abs_error = 0.0
+        for start in range(0, n_frames, frames_per_block):
+            stop = min(start + frames_per_block, n_frames)
+            block = scratch[:stop - start]
+            np.subtract(positions[start:stop], mean_pos[None, :, :], out=block)
+            disp_stored[start:stop] = block
+            block -= disp_stored[start:stop]
+            if block.size:
+                max_abs_error = max(max_abs_error, float(np.max(np.abs(block))))
+        return disp_stored, max_abs_error
+
+    def load_displacements(self) -> np.ndarray:
+        """Load the cached displacements (lossy, see .displacements.json) upcast to float32."""
+        cache_stem = self.filepath.parent / self.filepath.stem
+        disp_file = cache_stem.with_suffix('.displacements.npy')
+        if not disp_file.exists():
+            raise FileNotFoundError(f"No cached displacements for {self.filepath.name}: {disp_file.name}")
+        header_file = cache_stem.with_suffix('.displacements.json')
+        if header_file.exists():
+            with open(header_file) as f:
+                disp_header = json.load(f)
+            logger.debug(f"Cached displacements stored as {disp_header.get('dtype')} "
+                         f"(max abs error {disp_header.get('max_abs_error', 0.0):.3e}).")
+        return np.load(disp_file).astype(np.float32) 
\ No newline at end of file
@@ -4,6 +4,7 @@ Trajectory writing module for PSA.
 This module provides functionality for writing trajectory data to various file formats
 and saving analysis results.
 """
+import os
 import numpy as np
 from pathlib import Path
 import logging
@@ -16,6 +17,10 @@ from ..core.sed import SED
 
 logger = logging.getLogger(__name__)
 
+# Dumps at least this large are dropped from the page cache once written, so a long reconstruction
+# does not evict the input trajectory other calculations are still reading
+DUMP_DROP_CACHE_MIN_BYTES = 64 << 20
+
 class TrajectoryWriter:
     """Class for writing trajectory data and analysis results."""
     
@@ -136,6 +141,46 @@ class TrajectoryWriter:
         with open(filepath, 'w') as f:
             f.write(log_data) 
 
+def _drop_page_cache(f) -> None:
+    """Flush f and advise the kernel its pages are not needed again, if it reached DUMP_DROP_CACHE_MIN_BYTES."""
+    if not hasattr(os, 'posix_fadvise') or f.tell() < DUMP_DROP_CACHE_MIN_BYTES:
+        return
+    f.flush()
+    # Starts writeback and releases the clean pages; the file contents are unaffected
+    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+def _write_qdump_binary(filename: str, positions_tf: np.ndarray, types_tf: np.ndarray, is_triclinic: bool,
+                        bounds: tuple, tilts: tuple) -> None:
+    """
+    Write frames in the LAMMPS binary dump layout (as read by tools/binary2txt).
+    
+    Per frame: int64 timestep, int64 natoms, int32 triclinic flag, 6 int32 boundary
+    flags (0 = periodic), 6 float64 box bounds, 3 float64 tilts if triclinic,
+    int32 columns per atom, int32 chunk count (1), int32 chunk length and the
+    float64 'id type x y z' atom block.
+    """
+    n_fr, n_at, _ = positions_tf.shape
+    n_cols = 5
+    frame_header = np.array([bounds + (tilts if is_triclinic else ())], dtype='<f8')
+    atom_block = np.empty((n_at, n_cols), dtype='<f8')
+    atom_block[:, 0] = np.arange(1, n_at + 1)
+    atom_block[:, 1] = np.asarray(types_tf).astype(int)
+
+    with open(filename, 'wb', buffering=1 << 20) as f:
+        for i_fr in range(n_fr):
+            np.array([i_fr, n_at], dtype='<i8').tofile(f)
+            np.array([int(is_triclinic)] + [0] * 6, dtype='<i4').tofile(f)
+            frame_header.tofile(f)
+            np.array([n_cols, 1, n_at * n_cols], dtype='<i4').tofile(f)
+            atom_block[:, 2:] = positions_tf[i_fr]
+            atom_block.tofile(f)
+        _drop_page_cache(f)
+
+# Column format of the ATOMS section written by out_to_qdump
+_QDUMP_ATOM_FMT = '%d %d %.6f %.6f %.6f'
+# Atom lines formatted per % call (about 5 MB of text), so peak memory does not grow with the atom count
+QDUMP_SLICE_ROWS = 1 << 16
+
 def out_to_qdump(filename: str, positions_tf: np.ndarray, types_tf: np.ndarray, box_matrix: np.ndarray):
     n_fr, n_at, _ = positions_tf.shape
     Path(filename).parent.mkdir(parents=True, exist_ok=True)
@@ -205,24 +250,46 @@ def out_to_qdump(filename: str, positions_tf: np.ndarray, types_tf: np.ndarray,
         xy, xz, yz = 0.0, 0.0, 0.0
 
 
-    with open(filename, 'w') as f:
+    if Path(filename).suffix.lower() == '.bin':
+        # LAMMPS convention: a .bin suffix selects the binary dump format
+        _write_qdump_binary(filename, positions_tf, types_tf, is_triclinic,
+                            (xlo_bound, xhi_bound, ylo_bound, yhi_bound, zlo_bound, zhi_bound), (xy, xz, yz))
+        logger.debug(f"Wrote iSED reconstruction to binary Qdump: {filename}")
+        return
+
+    # The box, atom count and ATOMS header are the same in every frame: specialize the box lines for
+    # triclinic or orthogonal once and fold them into one per-frame header template
+    if is_triclinic:
+        # LAMMPS convention for triclinic box bounds with tilt factors
+        box_header = (f"ITEM: BOX BOUNDS xy xz yz pp pp pp\n"
+                      f"{xlo_bound:.8f} {xhi_bound:.8f} {xy:.8f}\n"
+                      f"{ylo_bound:.8f} {yhi_bound:.8f} {xz:.8f}\n"
+                      f"{zlo_bound:.8f} {zhi_bound:.8f} {yz:.8f}\n")
+    else:
+        box_header = (f"ITEM: BOX BOUNDS pp pp pp\n"
+                      f"{xlo_bound:.8f} {xhi_bound:.8f}\n"
+                      f"{ylo_bound:.8f} {yhi_bound:.8f}\n"
+                      f"{zlo_bound:.8f} {zhi_bound:.8f}\n")
+    frame_header_fmt = (f"ITEM: TIMESTEP\n%d\nITEM: NUMBER OF ATOMS\n{n_at}\n" + box_header
+                        + "ITEM: ATOMS id type x y z\n")
+
+    # Per-frame atom block: id and type columns are fixed, only the coordinates change
+    atom_block = np.empty((n_at, 5), dtype=np.float64)
+    atom_block[:, 0] = np.arange(1, n_at + 1)
+    atom_block[:, 1] = np.asarray(types_tf).astype(int)
+    # Atom lines are formatted QDUMP_SLICE_ROWS at a time with one C-level % call per slice, which
+    # bounds the temporary Python floats and strings regardless of the atom count
+    slice_fmts: Dict[int, str] = {}
+
+    with open(filename, 'w', buffering=1 << 20) as f:
         for i_fr in range(n_fr):
-            f.write(f"ITEM: TIMESTEP\n{i_fr}\n")
-            f.write(f"ITEM: NUMBER OF ATOMS\n{n_at}\n")
-            if is_triclinic:
-                # LAMMPS convention for triclinic box bounds with tilt factors
-                f.write(f"ITEM: BOX BOUNDS xy xz yz pp pp pp\n") 
-                f.write(f"{xlo_bound:.8f} {xhi_bound:.8f} {xy:.8f}\n")
-                f.write(f"{ylo_bound:.8f} {yhi_bound:.8f} {xz:.8f}\n")
-                f.write(f"{zlo_bound:.8f} {zhi_bound:.8f} {yz:.8f}\n")
-            else:
-                f.write(f"ITEM: BOX BOUNDS pp pp pp\n")
-                f.write(f"{xlo_bound:.8f} {xhi_bound:.8f}\n")
-                f.write(f"{ylo_bound:.8f} {yhi_bound:.8f}\n")
-                f.write(f"{zlo_bound:.8f} {zhi_bound:.8f}\n")
-            
-            f.write("ITEM: ATOMS id type x y z\n")
-            for j_at in range(n_at):
-                # Ensure atom types are integers
-                f.write(f"{j_at+1} {int(types_tf[j_at])} {positions_tf[i_fr,j_at,0]:.6f} {positions_tf[i_fr,j_at,1]:.6f} {positions_tf[i_fr,j_at,2]:.6f}\n")
+            f.write(frame_header_fmt % i_fr)
+            atom_block[:, 2:] = positions_tf[i_fr]
+            for start in range(0, n_at, QDUMP_SLICE_ROWS):
+                rows = atom_block[start:start + QDUMP_SLICE_ROWS]
+                slice_fmt = slice_fmts.get(len(rows))
+                if slice_fmt is None:
+                    slice_fmt = slice_fmts[len(rows)] = (_QDUMP_ATOM_FMT + '\n') * len(rows)
+                f.write(slice_fmt % tuple(rows.ravel().tolist()))
+        _drop_page_cache(f)
     logger.debug(f"Wrote iSED reconstruction to Qdump: {filename}") 
\ No newline at end of file
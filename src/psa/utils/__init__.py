@@ -8,17 +8,21 @@ for the PSA package.
 from .config_manager import ConfigManager
 from .helpers import (
     parse_direction,
+    parse_directions,
     update_dict_recursively,
     ensure_directory,
     validate_array_shape,
-    safe_divide
+    safe_divide,
+    nearest_index
 )
 
 __all__ = [
     'ConfigManager',
     'parse_direction',
+    'parse_directions',
     'update_dict_recursively',
     'ensure_directory',
     'validate_array_shape',
-    'safe_divide'
+    'safe_divide',
+    'nearest_index'
 ]
@@ -5,11 +5,19 @@ This module provides helper functions for various PSA operations.
 """
 import numpy as np
 import logging
-from typing import Union, List, Tuple, Dict, Optional
+from functools import lru_cache
+from numbers import Real
+from typing import Union, List, Tuple, Dict, Optional, Sequence
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=None)
+def _angle_to_unit_vec(angle_deg: float) -> Tuple[float, float, float]:
+    """Unit vector in the XY plane for an angle in degrees (memoized)."""
+    rad = np.deg2rad(angle_deg)
+    return (float(np.cos(rad)), float(np.sin(rad)), 0.0)
+
 def parse_direction(direction_spec: Union[str, int, float, List[float], Tuple[float, ...], np.ndarray, Dict[str, float]]) -> np.ndarray:
     """
     Parse a direction specification into a normalized 3D vector.
@@ -31,8 +39,7 @@ def parse_direction(direction_spec: Union[str, int, float, List[float], Tuple[fl
     vec = np.zeros(3, dtype=np.float32)
     
     if isinstance(direction_spec, (int, float)): 
-        rad = np.deg2rad(float(direction_spec))
-        vec = np.array([np.cos(rad), np.sin(rad), 0.0], dtype=np.float32)
+        vec = np.array(_angle_to_unit_vec(float(direction_spec)), dtype=np.float32)
         
     elif isinstance(direction_spec, str):
         d_lower = direction_spec.lower()
@@ -54,8 +61,7 @@ def parse_direction(direction_spec: Union[str, int, float, List[float], Tuple[fl
         else:
             try: # Try parsing as angle AFTER checking mapping
                 angle_deg = float(direction_spec)
-                rad = np.deg2rad(angle_deg)
-                vec = np.array([np.cos(rad), np.sin(rad), 0.0], dtype=np.float32)
+                vec = np.array(_angle_to_unit_vec(angle_deg), dtype=np.float32)
             except ValueError: # If not in mapping and not an angle, try parsing as x,y,z components
                 try:
                     parts = direction_spec.replace(',', ' ').split()
@@ -69,12 +75,10 @@ def parse_direction(direction_spec: Union[str, int, float, List[float], Tuple[fl
     elif isinstance(direction_spec, (list, tuple, np.ndarray)):
         d_arr = np.asarray(direction_spec, dtype=np.float32).squeeze() 
         if d_arr.ndim == 0: 
-            rad = np.deg2rad(d_arr.item())
-            vec = np.array([np.cos(rad), np.sin(rad), 0.0], dtype=np.float32)
+            vec = np.array(_angle_to_unit_vec(float(d_arr.item())), dtype=np.float32)
         elif d_arr.ndim == 1:
             if d_arr.size == 1:
-                rad = np.deg2rad(d_arr[0])
-                vec = np.array([np.cos(rad), np.sin(rad), 0.0], dtype=np.float32)
+                vec = np.array(_angle_to_unit_vec(float(d_arr[0])), dtype=np.float32)
             elif d_arr.size == 3:
                 vec = d_arr
             else:
@@ -84,8 +88,7 @@ def parse_direction(direction_spec: Union[str, int, float, List[float], Tuple[fl
             
     elif isinstance(direction_spec, dict): 
         if 'angle' in direction_spec: 
-            rad = np.deg2rad(float(direction_spec['angle']))
-            vec = np.array([np.cos(rad), np.sin(rad), 0.0], dtype=np.float32)
+            vec = np.array(_angle_to_unit_vec(float(direction_spec['angle'])), dtype=np.float32)
         elif any(k in direction_spec for k in ['h', 'k', 'l']): 
             vec = np.array([
                 float(direction_spec.get('h',0.0)),
@@ -108,6 +111,32 @@ def parse_direction(direction_spec: Union[str, int, float, List[float], Tuple[fl
             
     return vec / norm_val
 
+def parse_directions(direction_specs: Sequence[Union[str, int, float, List[float], Tuple[float, ...], np.ndarray, Dict[str, float]]]) -> np.ndarray:
+    """
+    Parse several direction specifications into normalized 3D vectors.
+    
+    Args:
+        direction_specs: Sequence of direction specifications, each accepted by
+            parse_direction. A sequence of plain numbers is treated as a list of
+            angles in degrees (in XY plane) and converted in one vectorized step.
+            
+    Returns:
+        Array of shape (N, 3) with one normalized direction vector per row
+        
+    Raises:
+        ValueError: If any direction specification is invalid
+        TypeError: If any direction specification type is not supported
+    """
+    if isinstance(direction_specs, np.ndarray) and direction_specs.ndim == 1 and np.issubdtype(direction_specs.dtype, np.number):
+        angles = direction_specs
+    elif len(direction_specs) > 0 and all(isinstance(d, Real) and not isinstance(d, bool) for d in direction_specs):
+        angles = direction_specs
+    else:
+        return np.array([parse_direction(d) for d in direction_specs], dtype=np.float32).reshape(-1, 3)
+
+    rad = np.deg2rad(np.asarray(angles, dtype=np.float64))
+    return np.stack([np.cos(rad), np.sin(rad), np.zeros_like(rad)], axis=1).astype(np.float32)
+
 def update_dict_recursively(base_dict: dict, update_with: dict) -> dict:
     """
     Recursively update a dictionary with another dictionary.
@@ -169,4 +198,26 @@ def safe_divide(a: np.ndarray, b: np.ndarray, fill_value: float = 0.0) -> np.nda
     """
     with np.errstate(divide='ignore', invalid='ignore'):
         result = np.divide(a, b, out=np.full_like(a, fill_value), where=b!=0)
-    return result 
\ No newline at end of file
+    return result
+
+
+def nearest_index(values: np.ndarray, target: float, assume_sorted: bool = False) -> int:
+    """
+    Index of the element of a 1D array closest to target (first one on ties).
+    
+    Args:
+        values: 1D array to search
+        target: Value to match
+        assume_sorted: values are ascending; use a binary search instead of a full pass
+        
+    Returns:
+        Index of the nearest element
+    """
+    if not assume_sorted:
+        return int(np.argmin(np.abs(values - target)))
+    i = int(np.searchsorted(values, target))
+    if i == 0:
+        return 0
+    if i == len(values):
+        return len(values) - 1
+    return i - 1 if target - values[i - 1] <= values[i] - target else i
@@ -4,11 +4,12 @@ Visualization module for PSA.
 This module provides plotting capabilities for SED data.
 """
 
-from .sed_plotter import SEDPlotter
+from .sed_plotter import SEDPlotter, FigureCache
 from .styles import apply_style, DEFAULT_STYLE, COLOR_SCHEMES
 
 __all__ = [
     'SEDPlotter',
+    'FigureCache',
     'apply_style',
     'DEFAULT_STYLE',
     'COLOR_SCHEMES'
@@ -1,6 +1,7 @@
 """
 Visualization module for SED data.
 """
+import io
 import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
@@ -11,8 +12,47 @@ from ..core.sed import SED
 
 logger = logging.getLogger(__name__)
 
+# Above this many values, percentile-based color limits are estimated from a subsample
+PERCENTILE_SAMPLE_SIZE = 200_000
+
+class FigureCache:
+    """
+    Figures reused by consecutive plots of the same kind, owned by one caller.
+
+    Pass it as SEDPlotter(..., figure_cache=cache) to redraw into a cleared Figure
+    instead of building a new one per plot. Not thread-safe: give each thread its
+    own cache. Leaving the with block (or close()) closes every cached Figure.
+    """
+    def __init__(self):
+        self._figures: Dict[Tuple, plt.Figure] = {}
+
+    def figure(self, key: Tuple, figsize, dpi=None) -> plt.Figure:
+        """The cleared Figure cached under key, created on first use."""
+        fig = self._figures.get(key)
+        if fig is None or not plt.fignum_exists(fig.number):
+            fig = plt.figure(figsize=figsize, dpi=dpi)
+            self._figures[key] = fig
+        else:
+            fig.clf() # Drops the previous axes and colorbar
+        return fig
+
+    def holds(self, fig: plt.Figure) -> bool:
+        return any(cached is fig for cached in self._figures.values())
+
+    def close(self):
+        for fig in self._figures.values():
+            plt.close(fig)
+        self._figures.clear()
+
+    def __enter__(self) -> 'FigureCache':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
 class SEDPlotter:
-    def __init__(self, sed_obj: SED, plot_type: str, output_path: str, **kwargs):
+    def __init__(self, sed_obj: SED, plot_type: str, output_path: str,
+                 figure_cache: Optional[FigureCache] = None, **kwargs):
         """
         Initialize SEDPlotter with SED data and plotting parameters.
         
@@ -20,9 +60,11 @@ class SEDPlotter:
             sed_obj: SED object containing data to plot
             plot_type: Type of plot to generate ('2d_intensity', '1d_slice', 'frequency_slice', etc.)
             output_path: Path to save the plot
+            figure_cache: Optional FigureCache to redraw into instead of creating (and closing) a new Figure
             **kwargs: Additional plotting parameters
         """
         self.sed = sed_obj
+        self.figure_cache = figure_cache
         self.plot_type = plot_type
         self.output_path = Path(output_path)
         self.plot_params = kwargs
@@ -51,12 +93,21 @@ class SEDPlotter:
             'intensity_scale': 'linear', # New parameter: 'linear', 'log', 'sqrt'
             'vmin_percentile': 0.0,
             'vmax_percentile': 100.0,
+            'raster_regular_grid': True, # Draw evenly spaced (k, freq) grids with imshow instead of pcolormesh
             'theme': 'light'  # Added theme parameter, default to light
         }
         
         # Update with user parameters
         self.plot_params = {**self.default_params, **kwargs}
-        
+
+    def _new_figure(self, figsize, dpi=None) -> Tuple[plt.Figure, plt.Axes]:
+        """Fresh Figure and Axes, or the cleared Figure from figure_cache when one is given."""
+        if self.figure_cache is None:
+            return plt.subplots(figsize=figsize, dpi=dpi)
+        key = (self.plot_type, tuple(figsize), dpi, self.plot_params.get('theme', 'light'))
+        fig = self.figure_cache.figure(key, figsize, dpi)
+        return fig, fig.add_subplot()
+
     def generate_plot(self):
         self._validate() # Call validate at the beginning
         fig = None
@@ -102,8 +153,12 @@ class SEDPlotter:
                     fig.tight_layout()
                 
                 self.output_path.parent.mkdir(parents=True, exist_ok=True)
-                # Use bbox_inches='tight' to prevent labels from being cut off
-                fig.savefig(self.output_path, dpi=self.plot_params.get('dpi', 300), bbox_inches='tight')
+                # Use bbox_inches='tight' to prevent labels from being cut off. Render into memory and
+                # write the file in one call instead of the encoder's many small writes
+                image_buffer = io.BytesIO()
+                fig.savefig(image_buffer, format=self.output_path.suffix.lstrip('.') or 'png',
+                            dpi=self.plot_params.get('dpi', 300), bbox_inches='tight')
+                self.output_path.write_bytes(image_buffer.getbuffer())
                 logger.info(f"Plot saved to: {self.output_path}")
             else:
                 # Log if no figure was produced, e.g. due to data issues handled in plot methods
@@ -112,32 +167,70 @@ class SEDPlotter:
         finally:
             if current_style_context:
                 current_style_context.__exit__(None, None, None) # Revert style changes
-            if fig: # Ensure figure is closed only if it was created
+            if fig and self.figure_cache is not None and self.figure_cache.holds(fig):
+                pass # Owned by the cache: kept open for the next plot, closed with the cache
+            elif fig: # Ensure figure is closed only if it was created
                 plt.close(fig) # Close the figure to free memory
             elif ax: # If ax was created but not fig (e.g. error before fig assigned to)
                 if ax.figure: plt.close(ax.figure)
 
+    def _percentile_limits(self, values: np.ndarray) -> Tuple[float, float]:
+        """
+        Color limits at the vmin/vmax percentiles of values.
+        
+        Both percentiles come from one partition-based pass. Arrays larger than
+        PERCENTILE_SAMPLE_SIZE are estimated from a fixed-seed uniform subsample;
+        this only affects the colorbar limits, never the plotted data.
+        """
+        values = values.ravel()
+        if values.size > PERCENTILE_SAMPLE_SIZE:
+            sample_idx = np.random.default_rng(0).integers(0, values.size, PERCENTILE_SAMPLE_SIZE)
+            values = values[sample_idx]
+        vmin, vmax = np.percentile(values, [self.plot_params['vmin_percentile'], self.plot_params['vmax_percentile']])
+        return vmin, vmax
+
+    @staticmethod
+    def _is_uniform(values: np.ndarray) -> bool:
+        """True if values are strictly increasing with (near-)constant spacing."""
+        if values.ndim != 1 or values.size < 2:
+            return False
+        steps = np.diff(values)
+        return bool(steps[0] > 0 and np.allclose(steps, steps[0], rtol=1e-3, atol=0))
+
+    def _draw_grid(self, ax, x: np.ndarray, y: np.ndarray, values: np.ndarray, vmin, vmax):
+        """
+        Draw values (len(y), len(x)) sampled at the nodes of the x/y grid.
+        
+        Evenly spaced grids are rasterized with imshow (bilinear, matching the
+        gouraud look), which is much faster to draw and save than pcolormesh;
+        anything else falls back to a gouraud pcolormesh.
+        """
+        if (self.plot_params.get('raster_regular_grid', True) and values.shape == (y.size, x.size)
+                and self._is_uniform(x) and self._is_uniform(y)):
+            half_dx, half_dy = 0.5 * (x[1] - x[0]), 0.5 * (y[1] - y[0])
+            return ax.imshow(values, origin='lower', aspect='auto', interpolation='bilinear',
+                             extent=(x[0] - half_dx, x[-1] + half_dx, y[0] - half_dy, y[-1] + half_dy),
+                             cmap=self.plot_params['cmap'], vmin=vmin, vmax=vmax)
+        X, Y = np.meshgrid(x, y)
+        return ax.pcolormesh(X, Y, values, cmap=self.plot_params['cmap'], shading='gouraud',
+                             vmin=vmin, vmax=vmax)
+
     def _plot_2d_intensity(self) -> Tuple[Optional[plt.Figure], Optional[plt.Axes]]:
         """Generate 2D intensity plot of SED data."""
-        fig, ax = plt.subplots(figsize=self.plot_params['figsize'], dpi=self.plot_params.get('dpi', 300))
+        fig, ax = self._new_figure(self.plot_params['figsize'], self.plot_params.get('dpi', 300))
         self._setup_ax_style(fig, ax)
 
-        # Calculate intensity
-        if self.sed.is_complex:
-            intensity_raw = np.sum(np.abs(self.sed.sed)**2, axis=-1)
-        else:
-            # If not complex, sed data is already summed intensities per polarization
-            intensity_raw = np.sum(self.sed.sed, axis=-1) 
+        # Calculate intensity: |sed|^2 summed over polarizations, or the stored intensities of a
+        # non-complex SED. Cached on the SED, so other plots of the same data reuse it
+        intensity_raw = self.sed.intensity
         
         # --- Frequency Masking (Positive and up to max_freq) ---
-        positive_freq_mask = self.sed.freqs >= 0
-        plot_freqs = self.sed.freqs[positive_freq_mask]
-        intensity_at_pos_freqs = intensity_raw[positive_freq_mask]
-
+        # Combined into one mask so the intensity array is gathered only once
+        freq_mask = self.sed.freqs >= 0
         if self.plot_params['max_freq'] is not None:
-            freq_upper_bound_mask = plot_freqs <= self.plot_params['max_freq']
-            plot_freqs = plot_freqs[freq_upper_bound_mask]
-            intensity_at_pos_freqs = intensity_at_pos_freqs[freq_upper_bound_mask]
+            freq_mask &= self.sed.freqs <= self.plot_params['max_freq']
+        plot_freqs = self.sed.freqs[freq_mask]
+        intensity_at_pos_freqs = intensity_raw[freq_mask] # Boolean indexing returns a fresh copy we may modify in place
 
         # --- K-points ---
         k_points_plot = self.sed.k_points
@@ -160,19 +253,23 @@ class SEDPlotter:
 
         if intensity_scale_type == 'log':
             if np.any(intensity_to_plot > 1e-12): # Check if there's anything to log scale
-                intensity_to_plot = np.log10(np.maximum(intensity_to_plot, 1e-12)) # Avoid log(0) or log(negative)
+                np.maximum(intensity_to_plot, 1e-12, out=intensity_to_plot) # Avoid log(0) or log(negative)
+                np.log10(intensity_to_plot, out=intensity_to_plot)
                 current_colorbar_label = 'Log10(Intensity)'
             else:
                 logger.warning("Log scaling requested for intensity, but all values are too small or zero. Using linear scale.")
         elif intensity_scale_type == 'sqrt':
             if np.any(intensity_to_plot >= 0): # Check if there's anything to sqrt scale
-                intensity_to_plot = np.sqrt(np.maximum(intensity_to_plot, 0)) # Avoid sqrt(negative)
+                np.maximum(intensity_to_plot, 0, out=intensity_to_plot) # Avoid sqrt(negative)
+                np.sqrt(intensity_to_plot, out=intensity_to_plot)
                 current_colorbar_label = 'Sqrt(Intensity)'
             else:
                 logger.warning("Sqrt scaling requested for intensity, but all values are negative. Using linear scale.")
         elif intensity_scale_type == 'dsqrt':
             if np.any(intensity_to_plot >= 0):
-                intensity_to_plot = np.sqrt(np.sqrt(np.maximum(intensity_to_plot, 0))) # Avoid sqrt(negative)
+                np.maximum(intensity_to_plot, 0, out=intensity_to_plot) # Avoid sqrt(negative)
+                np.sqrt(intensity_to_plot, out=intensity_to_plot)
+                np.sqrt(intensity_to_plot, out=intensity_to_plot)
                 current_colorbar_label = 'DSqrt(Intensity)'
             else:
                 logger.warning("DSqrt scaling requested for intensity, but all values are negative. Using linear scale.")
@@ -196,32 +293,28 @@ class SEDPlotter:
         # k_points_plot here refers to self.sed.k_points which are magnitudes for a 1D path.
         # So intensity_at_pos_freqs should already align with these k_points.
 
-        K, F = np.meshgrid(k_points_plot, plot_freqs)
+        grid_shape = (plot_freqs.size, k_points_plot.size) # Shape of the (F, K) node grid
         
-        if K.shape != intensity_to_plot.shape:
+        if grid_shape != intensity_to_plot.shape:
              # This logic might be too aggressive or based on wrong assumptions
              # Let's assume intensity_to_plot is (Nf_masked_final, Nk_final)
              # And k_points_plot is (Nk_final), plot_freqs is (Nf_masked_final)
              # The most common issue is if one of them is 1.
-            logger.warning(f"Shape mismatch for pcolormesh, K={K.shape}, F={F.shape}, C={intensity_to_plot.shape}. Check data alignment. Attempting to plot anyway.")
+            logger.warning(f"Shape mismatch for plotting, K/F grid={grid_shape}, C={intensity_to_plot.shape}. Check data alignment. Attempting to plot anyway.")
             # If intensity_to_plot is (Nf, Nk) it should be fine.
             # If K,F are (Nf,Nk) and C is (Nf,Nk) pcolormesh works.
         
         # --- Vmin, Vmax Calculation (Percentile-based) ---
-        valid_intensity_values = intensity_to_plot[~np.isnan(intensity_to_plot) & ~np.isinf(intensity_to_plot)]
+        valid_intensity_values = intensity_to_plot[np.isfinite(intensity_to_plot)]
         vmin, vmax = None, None
         if valid_intensity_values.size > 0:
-            vmin = np.percentile(valid_intensity_values, self.plot_params['vmin_percentile'])
-            vmax = np.percentile(valid_intensity_values, self.plot_params['vmax_percentile'])
+            vmin, vmax = self._percentile_limits(valid_intensity_values)
             if vmin == vmax: # Handle case where all values are the same
                 vmin = vmin - 0.1 if vmin != 0 else -0.1 # Avoid vmin=vmax=0
                 vmax = vmax + 0.1 if vmax != 0 else 0.1
         
         # --- Plotting ---
-        pcm = ax.pcolormesh(K, F, intensity_to_plot, 
-                      cmap=self.plot_params['cmap'],
-                           shading='gouraud', # Changed from 'auto'
-                           vmin=vmin, vmax=vmax)
+        pcm = self._draw_grid(ax, k_points_plot, plot_freqs, intensity_to_plot, vmin, vmax)
         
         # --- Labels and Title ---
         base_xlabel = self.plot_params['xlabel'] # This is r'k ($2\\pi/\\AA$)' by default
@@ -294,7 +387,7 @@ class SEDPlotter:
             
         # Calculate intensity
         if self.sed.is_complex:
-            intensity_data = np.sum(np.abs(self.sed.sed)**2, axis=-1)
+            intensity_data = self.sed.intensity.copy() # Scaled in place below; keep the cached intensity intact
         else:
             intensity_data = np.sum(self.sed.sed, axis=-1)
         
@@ -309,19 +402,23 @@ class SEDPlotter:
 
         if intensity_scale_type == 'log':
             if np.any(intensity_data > 1e-12):
-                intensity_data = np.log10(np.maximum(intensity_data, 1e-12))
+                np.maximum(intensity_data, 1e-12, out=intensity_data)
+                np.log10(intensity_data, out=intensity_data)
                 ylabel = 'Log10(Intensity)'
             else:
                 logger.warning("Log scaling requested for intensity, but all values are too small or zero. Using linear scale.")
         elif intensity_scale_type == 'sqrt':
             if np.any(intensity_data >= 0):
-                intensity_data = np.sqrt(np.maximum(intensity_data, 0))
+                np.maximum(intensity_data, 0, out=intensity_data)
+                np.sqrt(intensity_data, out=intensity_data)
                 ylabel = 'Sqrt(Intensity)'
             else:
                 logger.warning("Sqrt scaling requested for intensity, but all values are negative. Using linear scale.")
         elif intensity_scale_type == 'dsqrt':
             if np.any(intensity_data >= 0):
-                intensity_data = np.sqrt(np.sqrt(np.maximum(intensity_data, 0)))
+                np.maximum(intensity_data, 0, out=intensity_data)
+                np.sqrt(intensity_data, out=intensity_data)
+                np.sqrt(intensity_data, out=intensity_data)
                 ylabel = 'DSqrt(Intensity)'
             else:
                 logger.warning("DSqrt scaling requested for intensity, but all values are negative. Using linear scale.")
@@ -410,14 +507,15 @@ class SEDPlotter:
         # Calculate intensity for the selected frequency slice
         if self.sed.is_complex:
             # sed data shape: (n_freqs, n_kpoints, n_polarizations_or_groups)
-            intensity_slice = np.sum(np.abs(self.sed.sed[freq_idx, :, :])**2, axis=-1)
+            sed_slice = self.sed.sed[freq_idx, :, :]
+            intensity_slice = np.sum(sed_slice.real**2 + sed_slice.imag**2, axis=-1)
         else:
             # sed data shape: (n_freqs, n_kpoints) or (n_freqs, n_kpoints, n_polarizations_already_summed_incoherently)
             # if last dim is polarizations, sum it. If it's already (n_freqs, n_kpoints), it's fine.
             if self.sed.sed.ndim == 3:
                  intensity_slice = np.sum(self.sed.sed[freq_idx, :, :], axis=-1)
             elif self.sed.sed.ndim == 2: # (n_freqs, n_kpoints)
-                 intensity_slice = self.sed.sed[freq_idx, :]
+                 intensity_slice = self.sed.sed[freq_idx, :].copy() # Scaled in place below
             else:
                 logger.error(f"Unsupported SED data format for frequency slice: ndim={self.sed.sed.ndim}")
                 plt.close(fig)
@@ -448,19 +546,23 @@ class SEDPlotter:
         
         if intensity_scale_type == 'log':
             if np.any(plot_data > 1e-12):
-                plot_data = np.log10(np.maximum(plot_data, 1e-12))
+                np.maximum(plot_data, 1e-12, out=plot_data)
+                np.log10(plot_data, out=plot_data)
                 current_ylabel = 'Log10(Intensity)'
             else:
                 logger.warning("Log scaling requested for intensity, but all values are too small or zero. Using linear scale.")
         elif intensity_scale_type == 'sqrt':
             if np.any(plot_data >= 0):
-                plot_data = np.sqrt(np.maximum(plot_data, 0))
+                np.maximum(plot_data, 0, out=plot_data)
+                np.sqrt(plot_data, out=plot_data)
                 current_ylabel = 'Sqrt(Intensity)'
             else:
                 logger.warning("Sqrt scaling requested for intensity, but all values are negative. Using linear scale.")
         elif intensity_scale_type == 'dsqrt':
             if np.any(plot_data >= 0):
-                plot_data = np.sqrt(np.sqrt(np.maximum(plot_data, 0)))
+                np.maximum(plot_data, 0, out=plot_data)
+                np.sqrt(plot_data, out=plot_data)
+                np.sqrt(plot_data, out=plot_data)
                 current_ylabel = 'DSqrt(Intensity)'
             else:
                 logger.warning("DSqrt scaling requested for intensity, but all values are negative. Using linear scale.")
@@ -594,13 +696,11 @@ class SEDPlotter:
             logger.warning(f"Not enough data for 2D phase plot {self.output_path.name}.")
             return None, None
         
-        k_mesh, f_mesh = np.meshgrid(sed_item.k_points, plot_f)
         fig, ax = plt.subplots(figsize=(8,6))
         self._setup_ax_style(fig, ax)
-        pcm = ax.pcolormesh(k_mesh, f_mesh, plot_p, shading='gouraud', 
-                           cmap=self.plot_params['cmap'],
-                           vmin=self.plot_params.get('vmin', -np.pi/2), 
-                           vmax=self.plot_params.get('vmax', np.pi/2))
+        pcm = self._draw_grid(ax, sed_item.k_points, plot_f, plot_p,
+                              self.plot_params.get('vmin', -np.pi/2),
+                              self.plot_params.get('vmax', np.pi/2))
         
         plot_title = self.plot_params['title']
         ax.set_title(plot_title, color=self.plot_params.get('title_color', 'white' if self.plot_params.get('theme','light') == 'dark' else 'black'))
@@ -658,12 +758,13 @@ class SEDPlotter:
 
         # Calculate intensity for the selected frequency slice
         if self.sed.is_complex:
-            intensity_at_freq = np.sum(np.abs(self.sed.sed[freq_idx, :, :])**2, axis=-1)
+            sed_slice = self.sed.sed[freq_idx, :, :]
+            intensity_at_freq = np.sum(sed_slice.real**2 + sed_slice.imag**2, axis=-1)
         else:
             if self.sed.sed.ndim == 3: # (n_freqs, n_kpoints, n_polarizations_summed)
                  intensity_at_freq = np.sum(self.sed.sed[freq_idx, :, :], axis=-1)
             elif self.sed.sed.ndim == 2: # (n_freqs, n_kpoints) - already intensity
-                 intensity_at_freq = self.sed.sed[freq_idx, :]
+                 intensity_at_freq = self.sed.sed[freq_idx, :].copy() # Scaled in place below
             else:
                 logger.error(f"Unsupported SED data format for 3D heatmap: ndim={self.sed.sed.ndim}")
                 plt.close(fig)
@@ -759,19 +860,23 @@ class SEDPlotter:
 
         if intensity_scale_type == 'log':
             if np.any(plot_intensity_data > 1e-12):
-                plot_intensity_data = np.log10(np.maximum(plot_intensity_data, 1e-12))
+                np.maximum(plot_intensity_data, 1e-12, out=plot_intensity_data)
+                np.log10(plot_intensity_data, out=plot_intensity_data)
                 current_colorbar_label = 'Log10(Intensity)'
             else:
                 logger.warning("Log scaling requested, but all values too small. Using linear scale.")
         elif intensity_scale_type == 'sqrt':
             if np.any(plot_intensity_data >= 0): # Check if there's anything to sqrt scale
-                plot_intensity_data = np.sqrt(np.maximum(plot_intensity_data, 0)) # Avoid sqrt(negative)
+                np.maximum(plot_intensity_data, 0, out=plot_intensity_data) # Avoid sqrt(negative)
+                np.sqrt(plot_intensity_data, out=plot_intensity_data)
                 current_colorbar_label = 'Sqrt(Intensity)'
             else:
                 logger.warning("Sqrt scaling requested for intensity, but all values are negative. Using linear scale.")
         elif intensity_scale_type == 'dsqrt':
             if np.any(plot_intensity_data >= 0):
-                plot_intensity_data = np.sqrt(np.sqrt(np.maximum(plot_intensity_data, 0)))
+                np.maximum(plot_intensity_data, 0, out=plot_intensity_data)
+                np.sqrt(plot_intensity_data, out=plot_intensity_data)
+                np.sqrt(plot_intensity_data, out=plot_intensity_data)
                 current_colorbar_label = 'DSqrt(Intensity)'
             else:
                 logger.warning("DSqrt scaling requested for intensity, but all values are negative. Using linear scale.")
@@ -784,10 +889,9 @@ class SEDPlotter:
         vmax = self.plot_params.get('vmax')
 
         if vmin is None or vmax is None: # If not directly provided, calculate from percentiles of current slice
-            valid_intensity_values = plot_intensity_data[~np.isnan(plot_intensity_data) & ~np.isinf(plot_intensity_data)]
+            valid_intensity_values = plot_intensity_data[np.isfinite(plot_intensity_data)]
             if valid_intensity_values.size > 0:
-                calculated_vmin = np.percentile(valid_intensity_values, self.plot_params.get('vmin_percentile', 0.0))
-                calculated_vmax = np.percentile(valid_intensity_values, self.plot_params.get('vmax_percentile', 100.0))
+                calculated_vmin, calculated_vmax = self._percentile_limits(valid_intensity_values)
                 
                 if calculated_vmin == calculated_vmax: # Handle flat data
                     calculated_vmin = calculated_vmin - 0.1 if calculated_vmin != 0 else -0.1
@@ -1,6 +1,6 @@
 import pytest
 import numpy as np
-from psa.utils.helpers import parse_direction
+from psa.utils.helpers import parse_direction, parse_directions, nearest_index
 
 # Test cases for string inputs
 @pytest.mark.parametrize("input_str, expected_output", [
@@ -97,4 +97,34 @@ def test_parse_direction_zero_vector_behavior():
             np.testing.assert_allclose(result, small_norm_vec / np.linalg.norm(small_norm_vec), atol=1e-6)
     except ValueError as e:
         # This path should not be taken if small_norm_vec is not allclose to [0,0,0]
-        assert "Direction vector is zero" not in str(e), "Small norm vector incorrectly treated as zero vector" 
\ No newline at end of file
+        assert "Direction vector is zero" not in str(e), "Small norm vector incorrectly treated as zero vector" 
+
+# Test cases for batched direction parsing
+@pytest.mark.parametrize("input_specs", [
+    [0, 45, 90, 180.0],
+    np.array([0.0, 30.0, 60.0]),
+    ["x", [1, 1, 0], {"angle": 30}, 90],
+])
+def test_parse_directions_matches_parse_direction(input_specs):
+    result = parse_directions(input_specs)
+    expected = np.array([parse_direction(d) for d in input_specs])
+    assert result.shape == (len(input_specs), 3)
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, expected, atol=1e-6)
+
+def test_parse_directions_invalid():
+    with pytest.raises(ValueError):
+        parse_directions(["x", "invalid_string"])
+
+@pytest.mark.parametrize("target", [-1.0, 0.0, 0.24, 0.25, 0.26, 1.0, 5.0])
+def test_nearest_index_sorted_matches_argmin(target):
+    """The binary-search path agrees with argmin(|values - target|), ties included."""
+    values = np.linspace(0.0, 1.0, 5)
+    expected = int(np.argmin(np.abs(values - target)))
+    assert nearest_index(values, target, assume_sorted=True) == expected
+    assert nearest_index(values, target) == expected
+
+def test_nearest_index_unsorted():
+    """Unsorted arrays (e.g. fftfreq order) use a full search."""
+    freqs = np.fft.fftfreq(8, d=0.1)
+    assert nearest_index(freqs, -2.4) == int(np.argmin(np.abs(freqs + 2.4)))
@@ -0,0 +1,162 @@
+import pytest
+import json
+import numpy as np
+from psa.core.trajectory import Trajectory
+from psa.io.loader import TrajectoryLoader
+
+@pytest.fixture
+def small_trajectory():
+    """Provides a small random trajectory with thermal-sized displacements."""
+    rng = np.random.default_rng(0)
+    n_frames, n_atoms = 5, 4
+    base = rng.uniform(0, 10, (n_atoms, 3)).astype(np.float32)
+    positions = (base[None] + 0.05 * rng.standard_normal((n_frames, n_atoms, 3))).astype(np.float32)
+    box_matrix = np.diag([10.0, 10.0, 10.0]).astype(np.float32)
+    return Trajectory(positions=positions,
+                      velocities=rng.standard_normal((n_frames, n_atoms, 3)).astype(np.float32),
+                      types=np.array([1, 1, 2, 2], dtype=np.int32),
+                      timesteps=np.arange(n_frames, dtype=np.float32),
+                      box_matrix=box_matrix,
+                      box_lengths=np.diag(box_matrix).copy(),
+                      box_tilts=np.zeros(3, dtype=np.float32),
+                      dt_ps=1.0)
+
+@pytest.fixture
+def dump_file(tmp_path):
+    """Provides a placeholder trajectory path so the loader can be constructed."""
+    path = tmp_path / "traj.lammpstrj"
+    path.write_text("")
+    return path
+
+def test_npy_cache_round_trip(dump_file, small_trajectory):
+    """Test saved .npy caches are loaded back losslessly without OVITO."""
+    loader = TrajectoryLoader(str(dump_file), dt=0.5)
+    loader.save_trajectory_npy(small_trajectory)
+    traj = loader.load()
+    assert isinstance(traj.positions, np.memmap) and not traj.positions.flags.writeable
+    np.testing.assert_array_equal(traj.positions, small_trajectory.positions)
+    np.testing.assert_array_equal(traj.velocities, small_trajectory.velocities)
+    np.testing.assert_array_equal(traj.types, small_trajectory.types)
+    assert traj.dt_ps == 0.5
+
+def test_displacements_cache_is_float16_with_header(dump_file, small_trajectory, tmp_path):
+    """Test displacements are stored in float16 and the header records the error bound."""
+    loader = TrajectoryLoader(str(dump_file))
+    loader.save_trajectory_npy(small_trajectory)
+    assert np.load(tmp_path / "traj.displacements.npy").dtype == np.float16
+    header = json.loads((tmp_path / "traj.displacements.json").read_text())
+    assert header['dtype'] == 'float16'
+    assert header['shape'] == list(small_trajectory.positions.shape)
+
+    disp = loader.load_displacements()
+    expected = small_trajectory.positions - np.mean(small_trajectory.positions, axis=0)[None]
+    assert disp.dtype == np.float32
+    np.testing.assert_allclose(disp, expected, atol=header['max_abs_error'] * (1 + 1e-6))
+    assert header['max_abs_error'] < 1e-3
+
+def test_quantized_displacements_blocks(small_trajectory):
+    """Test blockwise quantization matches quantizing the full displacement array."""
+    mean_pos = small_trajectory.mean_positions
+    disp_stored, max_abs_error = TrajectoryLoader._quantized_displacements(
+        small_trajectory.positions, mean_pos, frames_per_block=2)
+    full = small_trajectory.positions - mean_pos[None]
+    np.testing.assert_array_equal(disp_stored, full.astype(np.float16))
+    assert max_abs_error == pytest.approx(np.max(np.abs(full.astype(np.float16).astype(np.float32) - full)))
+
+def _write_lammps_dump(path, frames, columns, bounds_lines, box_item="ITEM: BOX BOUNDS pp pp pp"):
+    """Writes a LAMMPS text dump with one (n_atoms, n_cols) array per frame."""
+    lines = []
+    for i, data in enumerate(frames):
+        lines += ["ITEM: TIMESTEP", str(10 * i), "ITEM: NUMBER OF ATOMS", str(len(data)), box_item]
+        lines += bounds_lines
+        lines.append("ITEM: ATOMS " + " ".join(columns))
+        lines += [" ".join(f"{v:g}" for v in row) for row in data]
+    path.write_text("\n".join(lines) + "\n")
+
+def test_native_lammps_reader_image_flags_and_frame0_order(tmp_path):
+    """Test wrapped coordinates plus image flags are unwrapped and atoms keep frame 0's file order."""
+    unwrapped = np.array([[[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]],
+                          [[-0.5, 2.5, 3.0], [4.0, 11.0, 6.5]]])
+    frames = []
+    for f in range(2):
+        images = np.floor(unwrapped[f] / 10.0)
+        wrapped = unwrapped[f] - 10.0 * images
+        rows = np.column_stack([[1, 2], [1, 2], wrapped, images, np.full((2, 3), 0.5 * f)])
+        frames.append(rows[::-1] if f == 0 else rows)  # frame 0 unsorted, frame 1 sorted by id
+    path = tmp_path / "traj.lammpstrj"
+    _write_lammps_dump(path, frames, ["id", "type", "x", "y", "z", "ix", "iy", "iz", "vx", "vy", "vz"],
+                       ["0 10", "0 10", "0 10"])
+
+    traj = TrajectoryLoader(str(path), dt=0.5).load()
+    np.testing.assert_allclose(traj.positions, unwrapped[:, ::-1], atol=1e-6)
+    np.testing.assert_allclose(traj.velocities[1], 0.5)
+    np.testing.assert_array_equal(traj.types, [2, 1])
+    np.testing.assert_array_equal(traj.timesteps, [0.0, 0.5])
+    np.testing.assert_allclose(traj.box_matrix, np.diag([10.0, 10.0, 10.0]))
+    assert (tmp_path / "traj.positions.npy").exists()
+
+def test_native_lammps_reader_unsorted_dump_keeps_file_order(tmp_path):
+    """Test an unsorted dump keeps file order per atom index, matching each atom by id across frames."""
+    from psa.io.lammps_reader import read_lammps_dump
+    ids = np.array([3, 1, 2])
+    base = {1: [1.0, 1.0, 1.0], 2: [2.0, 2.0, 2.0], 3: [3.0, 3.0, 3.0]}
+    frames = []
+    for f, order in enumerate([[3, 1, 2], [2, 3, 1], [1, 2, 3]]):
+        frames.append(np.array([[i, 10 + i] + [c + 0.1 * f for c in base[i]] for i in order]))
+    path = tmp_path / "traj.lammpstrj"
+    _write_lammps_dump(path, frames, ["id", "type", "xu", "yu", "zu"], ["0 10", "0 10", "0 10"])
+
+    data = read_lammps_dump(path)
+    np.testing.assert_array_equal(data['types'], 10 + ids)
+    for f in range(3):
+        np.testing.assert_allclose(data['positions'][f], [[c + 0.1 * f for c in base[i]] for i in ids], atol=1e-6)
+
+def test_native_lammps_reader_unwraps_jumps_without_image_flags(tmp_path):
+    """Test boundary crossings are unwrapped from frame-to-frame jumps when no image flags exist."""
+    x = np.array([9.6, 9.9, 0.2, 0.4])  # crosses the upper x boundary between frames 1 and 2
+    frames = [np.array([[1, 1, xi, 5.0, 5.0]]) for xi in x]
+    path = tmp_path / "traj.lammpstrj"
+    _write_lammps_dump(path, frames, ["id", "type", "x", "y", "z"], ["0 10", "0 10", "0 10"])
+
+    traj = TrajectoryLoader(str(path)).load()
+    np.testing.assert_allclose(traj.positions[:, 0, 0], [9.6, 9.9, 10.2, 10.4], atol=1e-5)
+    np.testing.assert_array_equal(traj.velocities, 0.0)
+
+def test_native_lammps_reader_triclinic_scaled(tmp_path):
+    """Test triclinic bounds are converted to OVITO's cell matrix and scaled coordinates to Cartesian."""
+    xy, xz, yz = 1.0, -0.5, 0.25
+    bounds = [f"{0 + min(0, xy, xz, xy + xz)} {8 + max(0, xy, xz, xy + xz)} {xy}",
+              f"{0 + min(0, yz)} {6 + max(0, yz)} {xz}",
+              f"0 4 {yz}"]
+    h = np.array([[8.0, xy, xz], [0.0, 6.0, yz], [0.0, 0.0, 4.0]])
+    scaled = np.array([[0.5, 0.25, 0.75]])
+    frames = [np.column_stack([[1], [2], scaled])]
+    path = tmp_path / "traj.lammpstrj"
+    _write_lammps_dump(path, frames, ["id", "type", "xsu", "ysu", "zsu"], bounds,
+                       box_item="ITEM: BOX BOUNDS xy xz yz pp pp pp")
+
+    traj = TrajectoryLoader(str(path)).load()
+    np.testing.assert_allclose(traj.box_matrix, h, atol=1e-6)
+    np.testing.assert_allclose(traj.box_tilts, [xy, xz, yz], atol=1e-6)
+    np.testing.assert_allclose(traj.positions[0, 0], h @ scaled[0], atol=1e-5)
+
+def test_native_lammps_reader_rejects_non_numeric_columns(tmp_path):
+    """Test dumps with non-numeric columns are rejected so the loader can fall back to OVITO."""
+    from psa.io.lammps_reader import read_lammps_dump
+    path = tmp_path / "traj.lammpstrj"
+    path.write_text("ITEM: TIMESTEP\n0\nITEM: NUMBER OF ATOMS\n1\nITEM: BOX BOUNDS pp pp pp\n"
+                    "0 1\n0 1\n0 1\nITEM: ATOMS id element x y z\n1 Si 0.1 0.2 0.3\n")
+    with pytest.raises(ValueError):
+        read_lammps_dump(path)
+
+def test_native_lammps_reader_mmap_matches_read_bytes(tmp_path, monkeypatch):
+    """Test the memory-mapped path for large dumps parses identically to the single-read path."""
+    from psa.io import lammps_reader
+    frames = [np.array([[2, 1, 1.0, 2.0, 3.0], [1, 2, 4.0, 5.0, 6.0]])]
+    path = tmp_path / "traj.lammpstrj"
+    _write_lammps_dump(path, frames, ["id", "type", "xu", "yu", "zu"], ["0 10", "0 10", "0 10"])
+    in_memory = lammps_reader.read_lammps_dump(path)
+    monkeypatch.setattr(lammps_reader, "READ_BYTES_MAX_SIZE", 0)
+    mapped = lammps_reader.read_lammps_dump(path)
+    np.testing.assert_array_equal(mapped['positions'], in_memory['positions'])
+    np.testing.assert_array_equal(mapped['types'], [1, 2])
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+import pytest
+import psa
+
+def test_import_psa_is_lazy():
+    """Test importing the package or the SED calculator does not pull in matplotlib."""
+    code = ("import sys, psa\n"
+            "assert 'matplotlib' not in sys.modules\n"
+            "from psa import SEDCalculator\n"
+            "assert 'matplotlib' not in sys.modules\n")
+    subprocess.run([sys.executable, '-c', code], check=True, env={**os.environ, 'PYTHONPATH': os.path.dirname(psa.__path__[0])})
+
+def test_lazy_public_names_resolve():
+    """Test every name in __all__ resolves to the object from its defining module."""
+    from psa.visualization.sed_plotter import SEDPlotter
+    for name in psa.__all__:
+        assert getattr(psa, name) is not None
+    assert psa.SEDPlotter is SEDPlotter
+    with pytest.raises(AttributeError):
+        psa.not_a_component
@@ -82,4 +82,55 @@ def test_sed_load_missing_files(tmp_path):
     # Create only one of the required files
     np.save(base_path.with_suffix('.sed.npy'), np.array([1]))
     with pytest.raises(FileNotFoundError):
-        SED.load(base_path)
\ No newline at end of file
+        SED.load(base_path)
+
+def test_sed_load_mmap(valid_sed_data, tmp_path):
+    """Test loading SED data as read-only memory maps."""
+    base_path = tmp_path / "test_sed_mmap"
+    SED(**valid_sed_data).save(base_path)
+    sed_obj_loaded = SED.load(base_path, mmap_mode='r')
+    assert isinstance(sed_obj_loaded.sed, np.memmap)
+    assert isinstance(sed_obj_loaded.phase, np.memmap)
+    np.testing.assert_array_equal(sed_obj_loaded.sed, valid_sed_data["sed"])
+    np.testing.assert_allclose(sed_obj_loaded.intensity, SED(**valid_sed_data).intensity)
+
+def test_sed_holds_references(valid_sed_data, tmp_path):
+    """Test SED keeps the given arrays (and memmaps) without copying."""
+    sed_obj = SED(**valid_sed_data)
+    assert sed_obj.sed is valid_sed_data["sed"]
+    assert sed_obj.phase is valid_sed_data["phase"]
+
+    base_path = tmp_path / "mapped"
+    sed_obj.save(base_path)
+    loaded = SED.load(base_path, mmap_mode='r')
+    assert isinstance(loaded.sed, np.memmap)
+    assert SED(loaded.sed, loaded.freqs, loaded.k_points, loaded.k_vectors).sed is loaded.sed
+
+def test_sed_intensity_is_cached(valid_sed_data):
+    """Test the intensity is computed once per SED and reused by later accesses."""
+    sed_obj = SED(**valid_sed_data)
+    assert sed_obj.intensity is sed_obj.intensity
+    assert sed_obj.intensity.dtype == np.float32
+
+def test_sed_intensity_quantized_roundtrip(valid_sed_data, tmp_path):
+    """Test the uint16 intensity cache reloads as a plotting-ready SED within quantization error."""
+    sed_obj = SED(**valid_sed_data, k_grid_shape=(5, 1))
+    cache_path = tmp_path / "intensity_q.npz"
+    sed_obj.save_intensity_quantized(cache_path)
+
+    with np.load(cache_path) as data:
+        assert data['q'].dtype == np.uint16
+    loaded = SED.load_intensity_quantized(cache_path)
+    assert not loaded.is_complex
+    assert loaded.sed.shape == sed_obj.intensity.shape + (1,)
+    assert loaded.k_grid_shape == (5, 1)
+    np.testing.assert_allclose(loaded.sed[..., 0], sed_obj.intensity, rtol=1e-3)
+    np.testing.assert_array_equal(loaded.freqs, sed_obj.freqs)
+
+def test_sed_from_intensity(valid_sed_data):
+    """Test an intensity-only SED shares the float32 array and reports it back as its intensity."""
+    intensity = np.random.rand(10, 5).astype(np.float32)
+    sed_obj = SED.from_intensity(intensity, valid_sed_data["freqs"], valid_sed_data["k_points"], valid_sed_data["k_vectors"])
+    assert not sed_obj.is_complex
+    assert sed_obj.sed.shape == (10, 5, 1) and np.shares_memory(sed_obj.sed, intensity)
+    np.testing.assert_array_equal(sed_obj.intensity, intensity)
@@ -0,0 +1,383 @@
+import logging
+import pytest
+import numpy as np
+from psa.core.trajectory import Trajectory
+from psa.core.sed_calculator import SEDCalculator
+
+def reference_sed(data, mean_pos, k_vectors):
+    """Straightforward per-k, per-polarization SED used as ground truth."""
+    n_t = data.shape[0]
+    sed_tk = np.zeros((n_t, len(k_vectors), 3), dtype=np.complex128)
+    for i_k, kvec in enumerate(k_vectors):
+        phase = np.exp(1j * np.dot(mean_pos.astype(np.float64), kvec.astype(np.float64)))
+        for pol in range(3):
+            sed_tk[:, i_k, pol] = data[:, :, pol].astype(np.float64) @ phase
+    return np.fft.fft(sed_tk, axis=0) / n_t
+
+@pytest.fixture
+def small_trajectory():
+    """Provides a small random trajectory on a 4x4x1 cubic supercell."""
+    rng = np.random.default_rng(42)
+    n_frames, n_atoms = 16, 12
+    lattice = np.array([[0.0, 0.0, 0.0], [2.0, 0.0, 0.0], [0.0, 2.0, 0.0]], dtype=np.float32)
+    cells = np.array([[i, j, 0] for i in range(2) for j in range(2)], dtype=np.float32) * 4.0
+    base = (cells[:, None, :] + lattice[None, :, :]).reshape(-1, 3)
+    positions = (base[None, :, :] + 0.05 * rng.standard_normal((n_frames, n_atoms, 3))).astype(np.float32)
+    velocities = rng.standard_normal((n_frames, n_atoms, 3)).astype(np.float32)
+    types = np.array([1, 2, 2] * 4, dtype=np.int32)
+    box_matrix = np.diag([8.0, 8.0, 4.0]).astype(np.float32)
+    return Trajectory(positions=positions,
+                      velocities=velocities,
+                      types=types,
+                      timesteps=np.arange(n_frames, dtype=np.float32) * 0.01,
+                      box_matrix=box_matrix,
+                      box_lengths=np.diag(box_matrix).copy(),
+                      box_tilts=np.zeros(3, dtype=np.float32),
+                      dt_ps=0.01)
+
+@pytest.fixture
+def calculator(small_trajectory):
+    return SEDCalculator(small_trajectory, nx=2, ny=2, nz=1)
+
+def assert_sed_close(actual, expected):
+    scale = np.max(np.abs(expected))
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-5 * scale)
+
+def test_calculate_coherent_matches_reference(calculator, small_trajectory):
+    """Coherent SED over all atoms matches the per-k reference loop."""
+    k_mags, k_vecs = calculator.get_k_path('x', bz_coverage=1.0, n_k=7)
+    sed_obj = calculator.calculate(k_mags, k_vecs)
+    mean_pos = np.mean(small_trajectory.positions, axis=0)
+    expected = reference_sed(small_trajectory.velocities, mean_pos, k_vecs)
+    assert sed_obj.sed.shape == (small_trajectory.n_frames, 7, 3)
+    assert sed_obj.sed.dtype == np.complex64
+    assert_sed_close(sed_obj.sed, expected)
+
+@pytest.mark.parametrize("k_chunk_size", [1, 3, 500])
+def test_calculate_chunking_is_transparent(calculator, k_chunk_size):
+    """Splitting k-points into chunks does not change the result."""
+    k_mags, k_vecs = calculator.get_k_path([1, 1, 0], bz_coverage=2.0, n_k=8)
+    full = calculator.calculate(k_mags, k_vecs).sed
+    chunked = calculator.calculate(k_mags, k_vecs, k_chunk_size=k_chunk_size).sed
+    assert_sed_close(chunked, full)
+
+def test_calculate_displacements_matches_reference(small_trajectory):
+    """Displacement-based SED uses positions relative to the mean positions."""
+    calc = SEDCalculator(small_trajectory, nx=2, ny=2, nz=1, use_displacements=True)
+    k_mags, k_vecs = calc.get_k_path('y', bz_coverage=1.0, n_k=5)
+    sed_obj = calc.calculate(k_mags, k_vecs)
+    mean_pos = np.mean(small_trajectory.positions, axis=0)
+    expected = reference_sed(small_trajectory.positions - mean_pos[None], mean_pos, k_vecs)
+    assert_sed_close(sed_obj.sed, expected)
+
+def test_calculate_incoherent_by_type(calculator, small_trajectory):
+    """Incoherent summation adds per-type intensities."""
+    k_mags, k_vecs = calculator.get_k_path('x', bz_coverage=1.0, n_k=6)
+    sed_obj = calculator.calculate(k_mags, k_vecs, basis_atom_types=[1, 2], summation_mode='incoherent')
+    assert not sed_obj.is_complex
+    mean_pos = np.mean(small_trajectory.positions, axis=0)
+    expected = np.zeros(sed_obj.sed.shape)
+    for atom_type in (1, 2):
+        idx = np.where(small_trajectory.types == atom_type)[0]
+        group_sed = reference_sed(small_trajectory.velocities[:, idx], mean_pos[idx], k_vecs)
+        expected += np.sum(np.abs(group_sed)**2, axis=-1)
+    np.testing.assert_allclose(sed_obj.sed, expected, rtol=0, atol=1e-5 * np.max(expected))
+
+def test_calculate_with_basis_indices(calculator, small_trajectory):
+    """A basis of atom indices restricts the coherent sum to those atoms."""
+    idx = np.array([0, 3, 4, 7])
+    k_mags, k_vecs = calculator.get_k_path('x', bz_coverage=1.0, n_k=4)
+    sed_obj = calculator.calculate(k_mags, k_vecs, basis_atom_indices=idx)
+    mean_pos = np.mean(small_trajectory.positions, axis=0)
+    expected = reference_sed(small_trajectory.velocities[:, idx], mean_pos[idx], k_vecs)
+    assert_sed_close(sed_obj.sed, expected)
+
+def test_k_grid_shape_and_ordering(calculator):
+    """k-grid vectors are ordered with the second plane axis varying fastest."""
+    _, k_vecs, grid_shape = calculator.get_k_grid('xy', (0.0, 1.0), (0.0, 2.0), 3, 2, k_fixed_val=0.5)
+    assert grid_shape == (3, 2)
+    expected = np.array([[kx, ky, 0.5] for kx in np.linspace(0, 1, 3) for ky in np.linspace(0, 2, 2)])
+    np.testing.assert_allclose(k_vecs, expected, atol=1e-6)
+
+@pytest.mark.parametrize("plane, make_vec", [
+    ("yz", lambda a, b: [0.5, a, b]),
+    ("zx", lambda a, b: [b, 0.5, a]),
+])
+def test_k_grid_other_planes(calculator, plane, make_vec):
+    """yz/zx grids place the first range on y/z and the second on z/x, first range slowest."""
+    _, k_vecs, _ = calculator.get_k_grid(plane, (0.0, 1.0), (0.0, 2.0), 3, 2, k_fixed_val=0.5)
+    expected = np.array([make_vec(a, b) for a in np.linspace(0, 1, 3) for b in np.linspace(0, 2, 2)])
+    np.testing.assert_allclose(k_vecs, expected, atol=1e-6)
+    with pytest.raises(ValueError):
+        calculator.get_k_grid("xx", (0.0, 1.0), (0.0, 2.0), 3, 2)
+
+def test_k_path_is_straight_line(calculator):
+    k_mags, k_vecs = calculator.get_k_path([1, 1, 0], bz_coverage=4.0, n_k=9, lat_param=2.5)
+    np.testing.assert_allclose(k_mags, np.linspace(0, 4.0 * 2 * np.pi / 2.5, 9), rtol=1e-6)
+    np.testing.assert_allclose(k_vecs, np.outer(k_mags, [1, 1, 0]) / np.sqrt(2), rtol=1e-6, atol=1e-7)
+    assert k_vecs.dtype == np.float32 and k_vecs.flags['C_CONTIGUOUS']
+
+@pytest.mark.parametrize("summation_mode", ["coherent", "incoherent"])
+def test_calculate_half_spectrum(calculator, small_trajectory, summation_mode):
+    """output_half_spectrum returns exactly the non-negative-frequency part of the full SED."""
+    k_mags, k_vecs = calculator.get_k_path('x', bz_coverage=1.0, n_k=6)
+    kwargs = dict(basis_atom_types=[1, 2], summation_mode=summation_mode, k_chunk_size=4)
+    full = calculator.calculate(k_mags, k_vecs, **kwargs)
+    half = calculator.calculate(k_mags, k_vecs, output_half_spectrum=True, **kwargs)
+    n_t = small_trajectory.n_frames
+    np.testing.assert_allclose(half.freqs, np.fft.rfftfreq(n_t, d=small_trajectory.dt_ps))
+    assert half.sed.shape == (n_t // 2 + 1,) + full.sed.shape[1:] and half.sed.dtype == full.sed.dtype
+    np.testing.assert_allclose(half.sed, full.sed[:n_t // 2 + 1], rtol=1e-4, atol=1e-6)
+
+def test_calculate_memory_budget_caps_chunks(calculator, small_trajectory, caplog):
+    """A tiny memory budget forces single k-point chunks, reported at info level, without changing the result."""
+    k_mags, k_vecs = calculator.get_k_path('x', bz_coverage=1.0, n_k=6)
+    full = calculator.calculate(k_mags, k_vecs).sed
+    capped = SEDCalculator(small_trajectory, nx=2, ny=2, nz=1, k_chunk_memory_budget_bytes=1)
+    assert capped._max_k_chunk_for_budget(capped.traj.n_atoms) == 1
+    with caplog.at_level(logging.INFO, logger="psa.core.sed_calculator"):
+        assert_sed_close(capped.calculate(k_mags, k_vecs).sed, full)
+    assert "Reducing k_chunk_size from 6 to 1" in caplog.text
+
+def test_memory_budget_must_be_positive(small_trajectory):
+    """A non-positive memory budget is rejected at construction."""
+    with pytest.raises(ValueError, match="k_chunk_memory_budget_bytes"):
+        SEDCalculator(small_trajectory, nx=2, ny=2, nz=1, k_chunk_memory_budget_bytes=0)
+
+def read_qdump_positions(path, n_atoms):
+    """Reads 'id type x y z' atom lines of every frame of a qdump."""
+    lines = path.read_text().splitlines()
+    frame_len = 9 + n_atoms
+    frames = [np.loadtxt(lines[i + 9:i + frame_len]) for i in range(0, len(lines), frame_len)]
+    return np.stack(frames)
+
+def test_ised_reconstruction_matches_reference(calculator, small_trajectory, tmp_path):
+    """iSED wiggles are Re(A_pol exp(i(ωt - k·r))) added to the mean positions."""
+    n_recon = 4
+    dump_file = tmp_path / "ised.dump"
+    calculator.ised('x', k_target=0.5, w_target=10.0, char_len_k_path=2.0, nk_on_path=5,
+                    rescale_factor=1.0, n_recon_frames=n_recon, dump_filepath=str(dump_file))
+    frames = read_qdump_positions(dump_file, small_trajectory.n_atoms)
+
+    k_mags, k_vecs = calculator.get_k_path('x', bz_coverage=1.0, n_k=5, lat_param=2.0)
+    sed_obj = calculator.calculate(k_mags, k_vecs, basis_atom_indices=np.arange(small_trajectory.n_atoms))
+    k_idx = np.argmin(np.abs(k_mags - 0.5))
+    w_idx = np.argmin(np.abs(sed_obj.freqs - 10.0))
+    mean_pos = np.mean(small_trajectory.positions, axis=0)
+    time_p = np.linspace(0, 2*np.pi, n_recon, endpoint=False)
+    phase = np.exp(1j * (time_p[:, None] - k_mags[k_idx] * mean_pos[None, :, 0]))
+    expected = mean_pos[None] + np.real(phase[:, :, None] * sed_obj.sed[w_idx, k_idx][None, None, :])
+
+    np.testing.assert_array_equal(frames[0, :, 1], small_trajectory.types)
+    np.testing.assert_allclose(frames[:, :, 2:], expected, atol=2e-6)
+
+def test_calculate_numpy_fft_fallback(calculator, monkeypatch):
+    """The NumPy FFT fallback gives the same SED as the scipy.fft path."""
+    from psa.core import sed_calculator
+    k_mags, k_vecs = calculator.get_k_path('y', bz_coverage=1.0, n_k=5)
+    default = calculator.calculate(k_mags, k_vecs).sed
+    monkeypatch.setattr(sed_calculator, "PYFFTW_AVAILABLE", False)
+    monkeypatch.setattr(sed_calculator, "SCIPY_FFT_AVAILABLE", False)
+    fallback = calculator.calculate(k_mags, k_vecs).sed
+    assert fallback.dtype == np.complex64
+    assert_sed_close(fallback, default)
+
+def test_calculate_pyfftw_matches_scipy(calculator, monkeypatch):
+    """The optional pyFFTW path gives the same SED as scipy.fft."""
+    pytest.importorskip("pyfftw")
+    from psa.core import sed_calculator
+    k_mags, k_vecs = calculator.get_k_path('y', bz_coverage=1.0, n_k=5)
+    fftw = calculator.calculate(k_mags, k_vecs).sed
+    monkeypatch.setattr(sed_calculator, "PYFFTW_AVAILABLE", False)
+    assert_sed_close(fftw, calculator.calculate(k_mags, k_vecs).sed)
+
+def test_import_leaves_pyfftw_cache_untouched():
+    """Importing the calculator does not change pyFFTW's process-wide interface cache state."""
+    pytest.importorskip("pyfftw")
+    import os, subprocess, sys
+    import psa
+    code = ("import pyfftw.interfaces.cache as cache\n"
+            "import psa.core.sed_calculator\n"
+            "assert not cache.is_enabled()\n")
+    subprocess.run([sys.executable, '-c', code], check=True, env={**os.environ, 'PYTHONPATH': os.path.dirname(psa.__path__[0])})
+
+def reference_chiral_phase(Z1, Z2, angle_range_opt):
+    """Per-element chiral phase used as ground truth."""
+    out = np.zeros(Z1.shape)
+    for idx in np.ndindex(Z1.shape):
+        z1, z2 = complex(Z1[idx]), complex(Z2[idx])
+        if angle_range_opt == "C":
+            d = (np.angle(z1) - np.angle(z2) + np.pi) % (2*np.pi) - np.pi
+            out[idx] = np.pi - d if d > np.pi/2 else (-np.pi - d if d < -np.pi/2 else d)
+        elif abs(z1)**2 < 1e-18 or abs(z2)**2 < 1e-18:
+            out[idx] = 0.0
+        elif angle_range_opt == "A":
+            out[idx] = np.arccos(np.clip((z1 * z2.conjugate()).real / (abs(z1) * abs(z2)), -1, 1))
+        else:
+            out[idx] = np.arcsin(np.clip((z1.real * z2.imag - z1.imag * z2.real) / (abs(z1) * abs(z2)), -1, 1))
+    return out
+
+@pytest.mark.parametrize("angle_range_opt", ["A", "B", "C"])
+def test_calculate_chiral_phase_matches_reference(calculator, angle_range_opt):
+    """Vectorized chiral phase matches the per-element definition, including zero amplitudes."""
+    rng = np.random.default_rng(3)
+    Z1 = (rng.standard_normal((6, 5)) + 1j * rng.standard_normal((6, 5))).astype(np.complex64)
+    Z2 = (rng.standard_normal((6, 5)) + 1j * rng.standard_normal((6, 5))).astype(np.complex64)
+    Z1[0, 0] = 0.0
+    phase = calculator.calculate_chiral_phase(Z1, Z2, angle_range_opt=angle_range_opt)
+    assert phase.dtype == np.float32 and phase.shape == Z1.shape
+    np.testing.assert_allclose(phase, reference_chiral_phase(Z1, Z2, angle_range_opt), atol=2e-3 if angle_range_opt == "A" else 1e-5)
+
+def test_calculate_double_precision(small_trajectory):
+    """dtype=np.complex128 runs the kernel in double precision and matches the reference closely."""
+    calc = SEDCalculator(small_trajectory, nx=2, ny=2, nz=1, dtype=np.complex128)
+    k_mags, k_vecs = calc.get_k_path('x', bz_coverage=1.0, n_k=5)
+    sed_obj = calc.calculate(k_mags, k_vecs)
+    assert sed_obj.sed.dtype == np.complex128
+    expected = reference_sed(small_trajectory.velocities, np.mean(small_trajectory.positions, axis=0), k_vecs)
+    np.testing.assert_allclose(sed_obj.sed, expected, rtol=0, atol=1e-6 * np.max(np.abs(expected)))
+
+def test_invalid_dtype(small_trajectory):
+    with pytest.raises(ValueError, match="dtype must be"):
+        SEDCalculator(small_trajectory, nx=2, ny=2, nz=1, dtype=np.float32)
+
+def test_invalid_device(small_trajectory):
+    with pytest.raises(ValueError, match="device must be"):
+        SEDCalculator(small_trajectory, nx=2, ny=2, nz=1, device='tpu')
+
+def test_cuda_device_matches_cpu(calculator, small_trajectory):
+    """The CuPy kernel reproduces the CPU SED (or device='cuda' fails clearly without CuPy)."""
+    from psa.core import sed_calculator
+    if not sed_calculator.CUPY_AVAILABLE:
+        with pytest.raises(ImportError, match="CuPy"):
+            SEDCalculator(small_trajectory, nx=2, ny=2, nz=1, device='cuda')
+        return
+    k_mags, k_vecs = calculator.get_k_path('x', bz_coverage=1.0, n_k=5)
+    gpu_calc = SEDCalculator(small_trajectory, nx=2, ny=2, nz=1, device='cuda')
+    np.testing.assert_allclose(gpu_calc.calculate(k_mags, k_vecs).sed,
+                               calculator.calculate(k_mags, k_vecs).sed, rtol=1e-4, atol=1e-6)
+
+def test_phase_table_disk_cache(small_trajectory, tmp_path):
+    """Phase tables are written once to phase_cache_dir and reused on later runs."""
+    cache_dir = tmp_path / "phase_cache"
+    calc = SEDCalculator(small_trajectory, nx=2, ny=2, nz=1, phase_cache_dir=cache_dir)
+    k_mags, k_vecs = calc.get_k_path('x', bz_coverage=1.0, n_k=6)
+    first = calc.calculate(k_mags, k_vecs, k_chunk_size=3).sed
+    cached_files = sorted(cache_dir.glob("phase_*.npy"))
+    assert len(cached_files) == 2
+    mtimes = [f.stat().st_mtime_ns for f in cached_files]
+    second = calc.calculate(k_mags, k_vecs, k_chunk_size=3).sed
+    assert [f.stat().st_mtime_ns for f in cached_files] == mtimes
+    np.testing.assert_array_equal(second, first)
+    uncached = SEDCalculator(small_trajectory, nx=2, ny=2, nz=1).calculate(k_mags, k_vecs).sed
+    assert_sed_close(first, uncached)
+
+@pytest.mark.parametrize("dtype", [np.complex64, np.complex128])
+def test_phase_table_matches_complex_exp(small_trajectory, dtype):
+    """The cos/sin phase table equals exp(i k·r) in the calculator's precision."""
+    calc = SEDCalculator(small_trajectory, nx=2, ny=2, nz=1, dtype=dtype)
+    _, k_vecs = calc.get_k_path('x', bz_coverage=2.0, n_k=7)
+    mean_pos = small_trajectory.mean_positions.astype(calc.real_dtype)
+    table = calc._phase_table(mean_pos, k_vecs)
+    assert table.dtype == dtype
+    np.testing.assert_allclose(table, np.exp(1j * (mean_pos.astype(np.float64) @ k_vecs.T.astype(np.float64))),
+                               rtol=1e-5, atol=1e-5)
+
+def test_calculate_atom_tiling_matches_untiled(calculator, monkeypatch):
+    """Tiling the atoms of the phase table leaves the SED unchanged."""
+    from psa.core import sed_calculator
+    k_mags, k_vecs = calculator.get_k_path('x', bz_coverage=1.0, n_k=6)
+    untiled = calculator.calculate(k_mags, k_vecs)
+    monkeypatch.setattr(sed_calculator, "PHASE_TILE_MEMORY_BYTES", 1)
+    monkeypatch.setattr(sed_calculator, "MIN_ATOM_TILE", 3)
+    assert calculator.traj.n_atoms > 3
+    assert_sed_close(calculator.calculate(k_mags, k_vecs).sed, untiled.sed)
+    np.testing.assert_allclose(calculator.calculate(k_mags, k_vecs, output_half_spectrum=True).sed,
+                               untiled.sed[:calculator.traj.n_frames // 2 + 1], rtol=1e-4, atol=1e-6)
+
+@pytest.mark.parametrize("type_group", [1, [2], [2, 1], [1, 1, 2], [3], [2, 3]])
+def test_atom_indices_for_types_matches_isin(calculator, type_group):
+    """Sorted-type lookup returns the same ascending indices as an isin mask."""
+    expected = np.where(np.isin(calculator.traj.types, type_group))[0]
+    np.testing.assert_array_equal(calculator._atom_indices_for_types(type_group), expected)
+
+def test_calculate_float64_k_vectors_match_float32(calculator):
+    """float64 k-vectors give the float32 kernel result, and the SED keeps the caller's array."""
+    k_mags, k_vecs = calculator.get_k_path('x', bz_coverage=1.0, n_k=5)
+    k_vecs64 = k_vecs.astype(np.float64)
+    sed_obj = calculator.calculate(k_mags, k_vecs64)
+    assert sed_obj.sed.dtype == np.complex64
+    assert sed_obj.k_vectors is k_vecs64
+    assert_sed_close(sed_obj.sed, calculator.calculate(k_mags, k_vecs).sed)
+
+def test_reciprocal_vectors_are_dual_to_primitive_vectors(small_trajectory):
+    """a_i·b_j = 2π δ_ij, including for a triclinic cell."""
+    small_trajectory.box_matrix = np.array([[8.0, 0.0, 0.0], [2.0, 8.0, 0.0], [0.5, 1.0, 4.0]], dtype=np.float32)
+    calc = SEDCalculator(small_trajectory, nx=2, ny=2, nz=1)
+    A = np.vstack([calc.a1, calc.a2, calc.a3])
+    np.testing.assert_allclose(A @ calc.recip_vecs_prim.T, 2 * np.pi * np.eye(3), atol=1e-5)
+    np.testing.assert_allclose(np.vstack([calc.b1, calc.b2, calc.b3]), calc.recip_vecs_prim, rtol=1e-6)
+
+@pytest.mark.parametrize("spec, expected", [
+    ("x", "x"),
+    ("1 1/0", "1_1-0"),
+    ([1, 0, 0], "1.00,0.00,0.00"),
+    (np.array([0.5, 0.25, 0.0]), "0.50,0.25,0.00"),
+    ((0, 1, 0), "0.00,1.00,0.00"),
+    ({'h': 1, 'k': 1}, "h1_k1_l0"),
+    (np.str_("y"), "y"),
+    (45.0, "45.0"),
+])
+def test_format_k_dir_spec(spec, expected):
+    """k-direction labels used in iSED plot filenames."""
+    from psa.core.sed_calculator import _format_k_dir_spec
+    assert _format_k_dir_spec(spec) == expected
+
+def test_ised_plots_input_spectrum(calculator, tmp_path, monkeypatch):
+    """With plot_dir_ised the summed input intensity is plotted directly as a non-complex SED."""
+    from psa.visualization import sed_plotter
+    captured = {}
+    original_init = sed_plotter.SEDPlotter.__init__
+    def capture_init(self, sed_obj, plot_type, output_path, **kwargs):
+        captured['sed'] = sed_obj
+        original_init(self, sed_obj, plot_type, output_path, **kwargs)
+    monkeypatch.setattr(sed_plotter.SEDPlotter, "__init__", capture_init)
+
+    import matplotlib.pyplot as plt
+    open_before = set(plt.get_fignums())
+    calculator.ised('x', k_target=0.5, w_target=10.0, char_len_k_path=2.0, nk_on_path=5,
+                    basis_atom_types_ised=[1, 2], n_recon_frames=2,
+                    dump_filepath=str(tmp_path / "ised.dump"), plot_dir_ised=tmp_path)
+    assert list(tmp_path.glob("iSED_x_0p50_10p00.png"))
+    assert set(plt.get_fignums()) == open_before # No Figure left open without a caller's FigureCache
+
+    k_mags, k_vecs = calculator.get_k_path('x', bz_coverage=1.0, n_k=5, lat_param=2.0)
+    expected = sum(calculator.calculate(k_mags, k_vecs, basis_atom_types=[t]).intensity for t in (1, 2))
+    assert not captured['sed'].is_complex and captured['sed'].sed.shape == expected.shape + (1,)
+    np.testing.assert_allclose(captured['sed'].intensity, expected + 1e-20, rtol=1e-4)
+
+def test_ised_without_plot_dir_skips_plotting(calculator, tmp_path, monkeypatch):
+    """Without plot_dir_ised the dump is written and the plotting path never runs."""
+    def fail(*args, **kwargs):
+        raise AssertionError("plotting path ran without plot_dir_ised")
+    monkeypatch.setattr(calculator, "_plot_ised_input", fail)
+    calculator.ised('x', k_target=0.5, w_target=10.0, char_len_k_path=2.0, nk_on_path=5,
+                    basis_atom_types_ised=[1, 2], n_recon_frames=2, dump_filepath=str(tmp_path / "ised.dump"))
+    assert (tmp_path / "ised.dump").stat().st_size > 0
+
+def test_ised_plot_error_is_not_masked_by_dump_error(calculator, tmp_path, monkeypatch):
+    """When the plot and the overlapped dump write both fail, the plot error propagates."""
+    from psa.core import sed_calculator
+    def fail_dump(*args, **kwargs):
+        raise OSError("dump failed")
+    def fail_plot(*args, **kwargs):
+        raise RuntimeError("plot failed")
+    monkeypatch.setattr(sed_calculator, "out_to_qdump", fail_dump)
+    monkeypatch.setattr(calculator, "_plot_ised_input", fail_plot)
+    with pytest.raises(RuntimeError, match="plot failed"):
+        calculator.ised('x', k_target=0.5, w_target=10.0, char_len_k_path=2.0, nk_on_path=5,
+                        n_recon_frames=2, dump_filepath=str(tmp_path / "ised.dump"), plot_dir_ised=tmp_path)
+    monkeypatch.setattr(calculator, "_plot_ised_input", lambda *args, **kwargs: None)
+    with pytest.raises(OSError, match="dump failed"):
+        calculator.ised('x', k_target=0.5, w_target=10.0, char_len_k_path=2.0, nk_on_path=5,
+                        n_recon_frames=2, dump_filepath=str(tmp_path / "ised.dump"), plot_dir_ised=tmp_path)
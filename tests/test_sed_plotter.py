@@ -0,0 +1,111 @@
+import pytest
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from psa.core.sed import SED
+from psa.visualization import SEDPlotter
+
+@pytest.fixture
+def path_sed():
+    """Provides a random complex SED on a 1D k-path with FFT-ordered frequencies."""
+    rng = np.random.default_rng(1)
+    n_freqs, n_k = 32, 10
+    sed = (rng.standard_normal((n_freqs, n_k, 3)) + 1j * rng.standard_normal((n_freqs, n_k, 3))).astype(np.complex64)
+    k_points = np.linspace(0, 1, n_k, dtype=np.float32)
+    k_vectors = np.stack([k_points, np.zeros(n_k), np.zeros(n_k)], axis=1).astype(np.float32)
+    phase = rng.uniform(-np.pi / 2, np.pi / 2, (n_freqs, n_k)).astype(np.float32)
+    return SED(sed, np.fft.fftfreq(n_freqs, d=0.01).astype(np.float32), k_points, k_vectors, phase=phase)
+
+@pytest.mark.parametrize("intensity_scale", ["linear", "log", "sqrt", "dsqrt"])
+def test_2d_intensity_color_limits(tmp_path, path_sed, intensity_scale):
+    """Test the 2D intensity color limits are percentiles of the scaled positive-frequency intensity."""
+    plotter = SEDPlotter(path_sed, '2d_intensity', str(tmp_path / "sed.png"),
+                         intensity_scale=intensity_scale, max_freq=30.0)
+    fig, ax = plotter._plot_2d_intensity()
+    freq_mask = (path_sed.freqs >= 0) & (path_sed.freqs <= 30.0)
+    intensity = np.sum(np.abs(path_sed.sed[freq_mask].astype(np.complex128))**2, axis=-1)
+    scaled = {"linear": intensity, "log": np.log10(np.maximum(intensity, 1e-12)),
+              "sqrt": np.sqrt(intensity), "dsqrt": np.sqrt(np.sqrt(intensity))}[intensity_scale]
+    expected = np.percentile(scaled, [plotter.plot_params['vmin_percentile'], plotter.plot_params['vmax_percentile']])
+    np.testing.assert_allclose(ax.images[0].get_clim(), expected, rtol=1e-5)
+    plt.close(fig)
+
+@pytest.mark.parametrize("plot_type", ["2d_intensity", "2d_phase", "frequency_slice"])
+def test_generate_plot_writes_file(tmp_path, path_sed, plot_type):
+    """Test each plot type renders and saves its output file."""
+    out_file = tmp_path / f"{plot_type}.png"
+    SEDPlotter(path_sed, plot_type, str(out_file)).generate_plot()
+    assert out_file.exists() and out_file.stat().st_size > 0
+
+@pytest.mark.parametrize("suffix, magic", [(".png", b"\x89PNG"), (".pdf", b"%PDF")])
+def test_generate_plot_format_follows_suffix(tmp_path, path_sed, suffix, magic):
+    """Test the buffered save encodes in the format named by the output suffix."""
+    out_file = tmp_path / f"sed{suffix}"
+    SEDPlotter(path_sed, '2d_intensity', str(out_file), dpi=50).generate_plot()
+    assert out_file.read_bytes().startswith(magic)
+
+def test_percentile_limits_subsample(tmp_path, path_sed, monkeypatch):
+    """Test large arrays get color limits from a deterministic subsample close to the exact percentiles."""
+    from psa.visualization import sed_plotter
+    monkeypatch.setattr(sed_plotter, "PERCENTILE_SAMPLE_SIZE", 20_000)
+    plotter = SEDPlotter(path_sed, '2d_intensity', str(tmp_path / "sed.png"), vmin_percentile=1, vmax_percentile=99)
+    values = np.random.default_rng(2).standard_normal(200_000)
+    limits = plotter._percentile_limits(values)
+    assert limits == plotter._percentile_limits(values)
+    np.testing.assert_allclose(limits, np.percentile(values, [1, 99]), atol=0.05)
+
+def test_3d_heatmap_color_limits(tmp_path):
+    """Test heatmap color limits are the vmin/vmax percentiles of the scaled intensity slice."""
+    rng = np.random.default_rng(3)
+    n_freqs, n_kx, n_ky = 8, 4, 5
+    kx, ky = np.meshgrid(np.linspace(-1, 1, n_kx), np.linspace(0, 1, n_ky), indexing='ij')
+    k_vectors = np.stack([kx.ravel(), ky.ravel(), np.zeros(kx.size)], axis=1).astype(np.float32)
+    sed = (rng.standard_normal((n_freqs, kx.size, 3)) + 1j * rng.standard_normal((n_freqs, kx.size, 3))).astype(np.complex64)
+    freqs = np.fft.fftfreq(n_freqs, d=0.1).astype(np.float32)
+    sed_obj = SED(sed, freqs, np.array([], dtype=np.float32), k_vectors, k_grid_shape=(n_kx, n_ky))
+    plotter = SEDPlotter(sed_obj, '3d_heatmap', str(tmp_path / "heatmap.png"), heatmap_target_freq_thz=freqs[1],
+                         intensity_scale='sqrt', vmin_percentile=5, vmax_percentile=95)
+    fig, ax = plotter._plot_3d_heatmap()
+    expected = np.percentile(np.sqrt(np.sum(np.abs(sed[1])**2, axis=-1)), [5, 95])
+    np.testing.assert_allclose(ax.collections[0].get_clim(), expected, rtol=1e-5)
+    plt.close(fig)
+
+def test_frequency_slice_does_not_modify_intensity_sed(tmp_path, path_sed):
+    """Test in-place intensity scaling never writes into a stored (non-complex) SED."""
+    intensity_sed = SED(path_sed.intensity, path_sed.freqs, path_sed.k_points, path_sed.k_vectors, is_complex=False)
+    original = intensity_sed.sed.copy()
+    SEDPlotter(intensity_sed, 'frequency_slice', str(tmp_path / "slice.png"),
+               target_frequency=float(path_sed.freqs[2]), intensity_scale='log').generate_plot()
+    np.testing.assert_array_equal(intensity_sed.sed, original)
+
+def test_2d_intensity_regular_grid_uses_imshow(tmp_path, path_sed):
+    """Test evenly spaced k/freq grids are rasterized with imshow, irregular ones fall back to pcolormesh."""
+    plotter = SEDPlotter(path_sed, '2d_intensity', str(tmp_path / "sed.png"))
+    fig, ax = plotter._plot_2d_intensity()
+    assert len(ax.images) == 1 and ax.images[0].get_array().shape == (np.sum(path_sed.freqs >= 0), path_sed.k_points.size)
+    plt.close(fig)
+
+    irregular = SED(path_sed.sed, path_sed.freqs, path_sed.k_points ** 2, path_sed.k_vectors)
+    fig, ax = SEDPlotter(irregular, '2d_intensity', str(tmp_path / "sed2.png"))._plot_2d_intensity()
+    assert len(ax.images) == 0 and len(ax.collections) == 1
+    plt.close(fig)
+
+def test_figure_cache_redraws_into_one_figure(tmp_path, path_sed):
+    """Test plots sharing a FigureCache reuse one open Figure, write the same image as a fresh plot, and close on exit."""
+    from psa.visualization import FigureCache
+    with FigureCache() as cache:
+        for name in ("a.png", "b.png"):
+            SEDPlotter(path_sed, '2d_intensity', str(tmp_path / name), figure_cache=cache, dpi=50).generate_plot()
+        assert len(cache._figures) == 1
+        fig = next(iter(cache._figures.values()))
+        assert plt.fignum_exists(fig.number) and len(fig.axes) == 2 # Plot axes and colorbar only
+    assert not plt.fignum_exists(fig.number)
+    SEDPlotter(path_sed, '2d_intensity', str(tmp_path / "fresh.png"), dpi=50).generate_plot()
+    assert (tmp_path / "b.png").read_bytes() == (tmp_path / "fresh.png").read_bytes()
+
+def test_plot_without_figure_cache_closes_figure(tmp_path, path_sed):
+    """Test a plot without a FigureCache leaves no Figure open."""
+    open_before = set(plt.get_fignums())
+    SEDPlotter(path_sed, '2d_intensity', str(tmp_path / "sed.png"), dpi=50).generate_plot()
+    assert set(plt.get_fignums()) == open_before
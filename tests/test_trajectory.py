@@ -63,4 +63,25 @@ def test_trajectory_properties(valid_trajectory_data):
     """Test n_frames and n_atoms properties."""
     traj = Trajectory(**valid_trajectory_data)
     assert traj.n_frames == 2
-    assert traj.n_atoms == 3 
\ No newline at end of file
+    assert traj.n_atoms == 3 
+
+def test_trajectory_mean_positions(valid_trajectory_data):
+    """Test mean_positions is the cached time average of positions."""
+    traj = Trajectory(**valid_trajectory_data)
+    np.testing.assert_allclose(traj.mean_positions, np.mean(traj.positions, axis=0), rtol=1e-6)
+    assert traj.mean_positions.shape == (traj.n_atoms, 3)
+    assert traj.mean_positions is traj.mean_positions
+
+def test_trajectory_arrays_are_contiguous_float32(valid_trajectory_data):
+    """Test per-frame arrays are normalized to C-contiguous float32 and types to int32."""
+    data = dict(valid_trajectory_data)
+    data["positions"] = np.asfortranarray(np.asarray(data["positions"], dtype=np.float64))
+    traj = Trajectory(**data)
+    for arr in (traj.positions, traj.velocities):
+        assert arr.dtype == np.float32 and arr.flags['C_CONTIGUOUS']
+    assert traj.types.dtype == np.int32
+    np.testing.assert_allclose(traj.positions, valid_trajectory_data["positions"], rtol=1e-6)
+
+    already = np.ascontiguousarray(valid_trajectory_data["velocities"], dtype=np.float32)
+    data["velocities"] = already
+    assert Trajectory(**data).velocities is already
@@ -0,0 +1,101 @@
+import pytest
+import numpy as np
+from psa.io.writer import out_to_qdump
+
+@pytest.fixture
+def small_dump_data():
+    """Provides two frames of three atoms in an orthogonal box."""
+    positions = np.array([[[0.0, 0.0, 0.0], [1.25, 2.5, 3.75], [-1.0, 0.123456789, 9.0]],
+                          [[0.5, 0.5, 0.5], [1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]], dtype=np.float32)
+    types = np.array([1, 2, 1], dtype=np.int32)
+    box_matrix = np.diag([10.0, 11.0, 12.0]).astype(np.float32)
+    return positions, types, box_matrix
+
+def test_out_to_qdump_format(tmp_path, small_dump_data):
+    """Test the dump has one header per frame and 'id type x y z' atom lines."""
+    positions, types, box_matrix = small_dump_data
+    out_file = tmp_path / "out" / "ised.dump"
+    out_to_qdump(str(out_file), positions, types, box_matrix)
+
+    lines = out_file.read_text().splitlines()
+    assert len(lines) == 2 * (9 + 3)
+    assert lines[:9] == ["ITEM: TIMESTEP", "0", "ITEM: NUMBER OF ATOMS", "3",
+                         "ITEM: BOX BOUNDS pp pp pp",
+                         "0.00000000 10.00000000", "0.00000000 11.00000000", "0.00000000 12.00000000",
+                         "ITEM: ATOMS id type x y z"]
+    assert lines[9:12] == ["1 1 0.000000 0.000000 0.000000",
+                           "2 2 1.250000 2.500000 3.750000",
+                           "3 1 -1.000000 0.123457 9.000000"]
+    assert lines[13] == "1"
+
+def test_out_to_qdump_triclinic_header(tmp_path, small_dump_data):
+    """Test tilted boxes are written with LAMMPS triclinic bounds."""
+    positions, types, box_matrix = small_dump_data
+    box_matrix = box_matrix.copy()
+    box_matrix[0, 1] = 2.0
+    out_file = tmp_path / "tri.dump"
+    out_to_qdump(str(out_file), positions, types, box_matrix)
+
+    lines = out_file.read_text().splitlines()
+    assert lines[4] == "ITEM: BOX BOUNDS xy xz yz pp pp pp"
+    assert lines[5] == "0.00000000 12.00000000 2.00000000"
+
+def read_binary_dump(path, triclinic):
+    """Parses the LAMMPS binary dump layout written for .bin files."""
+    raw = path.read_bytes()
+    n_box = 9 if triclinic else 6
+    frames, offset = [], 0
+    while offset < len(raw):
+        timestep, n_atoms = np.frombuffer(raw, '<i8', 2, offset); offset += 16
+        flags = np.frombuffer(raw, '<i4', 7, offset); offset += 28
+        box = np.frombuffer(raw, '<f8', n_box, offset); offset += 8 * n_box
+        n_cols, n_chunks, n_values = np.frombuffer(raw, '<i4', 3, offset); offset += 12
+        atoms = np.frombuffer(raw, '<f8', n_values, offset).reshape(n_atoms, n_cols); offset += 8 * n_values
+        frames.append((timestep, flags, box, n_chunks, atoms))
+    return frames
+
+def test_out_to_qdump_binary(tmp_path, small_dump_data):
+    """Test a .bin filename writes the LAMMPS binary dump layout with raw coordinates."""
+    positions, types, box_matrix = small_dump_data
+    out_file = tmp_path / "ised.bin"
+    out_to_qdump(str(out_file), positions, types, box_matrix)
+
+    frames = read_binary_dump(out_file, triclinic=False)
+    assert len(frames) == 2
+    for i_fr, (timestep, flags, box, n_chunks, atoms) in enumerate(frames):
+        assert timestep == i_fr and n_chunks == 1
+        np.testing.assert_array_equal(flags, [0, 0, 0, 0, 0, 0, 0])
+        np.testing.assert_allclose(box, [0, 10, 0, 11, 0, 12])
+        np.testing.assert_array_equal(atoms[:, 0], [1, 2, 3])
+        np.testing.assert_array_equal(atoms[:, 1], types)
+        np.testing.assert_array_equal(atoms[:, 2:], positions[i_fr])
+
+@pytest.mark.parametrize("suffix", [".dump", ".bin"])
+def test_out_to_qdump_drops_page_cache(tmp_path, small_dump_data, monkeypatch, suffix):
+    """Test large dumps are advised out of the page cache once written, with unchanged contents."""
+    import os
+    from psa.io import writer
+    if not hasattr(os, "posix_fadvise"):
+        pytest.skip("posix_fadvise not available")
+    positions, types, box_matrix = small_dump_data
+    reference = tmp_path / f"ref{suffix}"
+    out_to_qdump(str(reference), positions, types, box_matrix)
+
+    calls = []
+    monkeypatch.setattr(writer, "DUMP_DROP_CACHE_MIN_BYTES", 0)
+    monkeypatch.setattr(writer.os, "posix_fadvise", lambda fd, offset, length, advice: calls.append(advice))
+    out_file = tmp_path / f"ised{suffix}"
+    out_to_qdump(str(out_file), positions, types, box_matrix)
+    assert calls == [os.POSIX_FADV_DONTNEED]
+    assert out_file.read_bytes() == reference.read_bytes()
+
+def test_out_to_qdump_slices_match_whole_frame(tmp_path, small_dump_data, monkeypatch):
+    """Test formatting atom lines in fixed-size slices (with a partial last slice) gives the same file."""
+    from psa.io import writer
+    positions, types, box_matrix = small_dump_data
+    whole = tmp_path / "whole.dump"
+    out_to_qdump(str(whole), positions, types, box_matrix)
+    monkeypatch.setattr(writer, "QDUMP_SLICE_ROWS", 2)
+    sliced = tmp_path / "sliced.dump"
+    out_to_qdump(str(sliced), positions, types, box_matrix)
+    assert sliced.read_bytes() == whole.read_bytes()